@@ -0,0 +1,101 @@
+# bench/dataset.py
+"""Issues FSA sintéticas no mesmo layout de campos (customfield_*) que o painel lê do Jira."""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from utils.records import (
+    CF_LOJA, CF_PDV, CF_ATIVO, CF_PROBLEMA, CF_ENDERECO, CF_UF, CF_CEP, CF_CIDADE, CF_DATA_AGENDADA,
+)
+
+# (id, nome, peso na amostra) — ids iguais aos do streamlit_app.py
+STATUS = [
+    ("11499", "AGENDAMENTO", 30),
+    ("11481", "Agendado", 25),
+    ("11500", "TEC-CAMPO", 15),
+    ("11502", "Aguardando Spare", 5),
+    ("11498", "Resolvido", 25),
+]
+STATUS_POR_ID = {sid: nome for sid, nome, _ in STATUS}
+
+# workflow simplificado: status → [(transition id, nome, status destino)]
+WORKFLOW = {
+    "11499": [("21", "Agendar", "11481"), ("41", "Aguardar Spare", "11502")],
+    "11481": [("31", "Enviar para TEC-CAMPO", "11500"), ("11", "Voltar para AGENDAMENTO", "11499")],
+    "11500": [("51", "Resolver", "11498"), ("12", "Voltar para Agendado", "11481")],
+    "11502": [("61", "Spare recebido", "11499")],
+    "11498": [],
+}
+
+CIDADES = [
+    ("São Paulo", "SP", "01000"), ("Campinas", "SP", "13000"), ("Rio de Janeiro", "RJ", "20000"),
+    ("Belo Horizonte", "MG", "30000"), ("Curitiba", "PR", "80000"), ("Porto Alegre", "RS", "90000"),
+    ("Salvador", "BA", "40000"), ("Recife", "PE", "50000"), ("Fortaleza", "CE", "60000"),
+    ("Goiânia", "GO", "74000"), ("Florianópolis", "SC", "88000"), ("Brasília", "DF", "70000"),
+]
+PROBLEMAS = ["PDV não liga", "Impressora fiscal", "Gaveta travada", "Leitor de código", "Tela sem imagem", "Rede"]
+
+TZ_BR = timezone(timedelta(hours=-3))
+
+
+def jira_dt(dt: datetime) -> str:
+    """Mesmo formato do Jira Cloud: 2024-05-01T10:00:00.000-0300."""
+    return dt.astimezone(TZ_BR).strftime("%Y-%m-%dT%H:%M:%S.000%z")
+
+
+def transicoes(status_id: str) -> List[Dict[str, Any]]:
+    return [
+        {"id": tid, "name": nome, "to": {"id": to, "name": STATUS_POR_ID[to]}}
+        for tid, nome, to in WORKFLOW.get(status_id, [])
+    ]
+
+
+def gerar_issues(n: int, seed: int = 42, n_lojas: Optional[int] = None, agora: Optional[datetime] = None) -> List[dict]:
+    """
+    `n` issues FSA-1..FSA-n. Lojas ~ n/8 (mín. 20), com alguns (PDV, ativo) repetidos por
+    loja para exercitar a detecção de duplicidade; datas nos últimos 90 dias.
+    """
+    rnd = random.Random(seed)
+    agora = agora or datetime.now(timezone.utc)
+    n_lojas = n_lojas or max(20, n // 8)
+    lojas = []
+    for i in range(n_lojas):
+        cidade, uf, cep5 = rnd.choice(CIDADES)
+        lojas.append({
+            "codigo": f"L{i:05d}", "cidade": cidade, "uf": uf,
+            "cep": f"{cep5[:2]}{rnd.randint(0, 999):03d}-{rnd.randint(0, 999):03d}",
+            "endereco": f"R. {rnd.choice(['das Flores', 'XV de Novembro', 'Brasil', 'São João'])}, {rnd.randint(1, 3000)}",
+        })
+    status_pop = [(sid, nome) for sid, nome, _ in STATUS]
+    status_pesos = [p for _, _, p in STATUS]
+
+    issues = []
+    for i in range(1, n + 1):
+        loja = rnd.choice(lojas)
+        sid, snome = rnd.choices(status_pop, weights=status_pesos)[0]
+        # nada alterado na última hora: o delta do benchmark só traz o que `FakeJira.tocar` mexer
+        base = agora - timedelta(hours=1)
+        created = base - timedelta(days=rnd.uniform(0, 90))
+        updated = min(base, created + timedelta(days=rnd.uniform(0, 10)))
+        fields = {
+            "summary": f"Chamado {i}",
+            "status": {"id": sid, "name": snome},
+            CF_LOJA: {"value": loja["codigo"]},
+            CF_PDV: str(rnd.randint(1, 12)),
+            CF_ATIVO: f"AT{rnd.randint(1, 40):03d}",
+            CF_PROBLEMA: rnd.choice(PROBLEMAS),
+            CF_ENDERECO: loja["endereco"],
+            CF_CIDADE: loja["cidade"],
+            CF_UF: {"value": loja["uf"]},
+            CF_CEP: loja["cep"],
+            CF_DATA_AGENDADA: None,
+            "customfield_12279": None,
+            "created": jira_dt(created),
+            "updated": jira_dt(updated),
+            "resolutiondate": jira_dt(updated) if sid == "11498" else None,
+        }
+        if sid == "11481":
+            dia = agora + timedelta(days=rnd.randint(-2, 14))
+            fields[CF_DATA_AGENDADA] = jira_dt(dia.replace(hour=rnd.choice([8, 10, 14, 16]), minute=0))
+        issues.append({"id": str(10000 + i), "key": f"FSA-{i}", "fields": fields})
+    return issues
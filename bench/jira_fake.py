@@ -0,0 +1,264 @@
+# bench/jira_fake.py
+"""
+Servidor HTTP local que imita o subconjunto da API REST v3 do Jira Cloud usado pelo painel:
+
+  GET  /rest/api/3/myself
+  POST /rest/api/3/search/jql                (paginação por nextPageToken)
+  POST /rest/api/3/search/approximate-count
+  GET  /rest/api/3/issue/{key}                (fields=status)
+  GET  /rest/api/3/issue/{key}/transitions
+  POST /rest/api/3/issue/{key}/transitions
+
+O JQL é avaliado só no nível que o painel usa (project, status in/=, updated >= -Nm,
+resolutiondate >= / <=, ORDER BY updated). Latência fixa e 429 (com Retry-After) configuráveis.
+"""
+import json
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.records import parse_dt
+
+from .dataset import STATUS_POR_ID, jira_dt, transicoes
+
+MAX_RESULTS = 5000
+
+_RE_STATUS_IN = re.compile(r"status\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+_RE_STATUS_EQ = re.compile(r"status\s*=\s*(\"[^\"]*\"|\S+)", re.IGNORECASE)
+_RE_UPDATED_REL = re.compile(r"updated\s*>=\s*-(\d+)m", re.IGNORECASE)
+_RE_RESOLUTION = re.compile(r"resolutiondate\s*(>=|<=)\s*\"([^\"]+)\"", re.IGNORECASE)
+_RE_ORDER_BY = re.compile(r"\s+ORDER\s+BY\s+.*$", re.IGNORECASE | re.DOTALL)
+
+
+def _status_aceitos(lista: str) -> set:
+    return {v.strip().strip('"').lower() for v in lista.split(",") if v.strip()}
+
+
+def compilar_jql(jql: str) -> Callable[[dict], bool]:
+    """JQL (subconjunto) → predicado sobre a issue."""
+    jql = _RE_ORDER_BY.sub("", jql or "")
+    testes: List[Callable[[dict], bool]] = []
+
+    m = _RE_STATUS_IN.search(jql) or _RE_STATUS_EQ.search(jql)
+    if m:
+        aceitos = _status_aceitos(m.group(1))
+        testes.append(lambda i: i["fields"]["status"]["id"] in aceitos
+                      or i["fields"]["status"]["name"].lower() in aceitos)
+
+    m = _RE_UPDATED_REL.search(jql)
+    if m:
+        limite = datetime.now(timezone.utc) - timedelta(minutes=int(m.group(1)))
+        testes.append(lambda i: parse_dt(i["fields"]["updated"]) >= limite)
+
+    for op, valor in _RE_RESOLUTION.findall(jql):
+        # JQL usa "yyyy-MM-dd HH:mm" no fuso do usuário; o fake assume UTC
+        lim = datetime.strptime(valor, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+        if op == ">=":
+            testes.append(lambda i, lim=lim: bool(i["fields"]["resolutiondate"])
+                          and parse_dt(i["fields"]["resolutiondate"]) >= lim)
+        else:
+            testes.append(lambda i, lim=lim: bool(i["fields"]["resolutiondate"])
+                          and parse_dt(i["fields"]["resolutiondate"]) <= lim)
+
+    return lambda issue: all(t(issue) for t in testes)
+
+
+class FakeJira:
+    """
+    Jira em memória servido em 127.0.0.1 (porta livre). `latencia` (s) é somada a cada
+    resposta; `taxa_429` (0..1) é a chance de responder 429 com Retry-After: `retry_after`.
+    """
+
+    def __init__(self, issues: List[dict], latencia: float = 0.0, taxa_429: float = 0.0,
+                 retry_after: float = 0.0, seed: int = 0):
+        self.latencia = float(latencia)
+        self.taxa_429 = float(taxa_429)
+        self.retry_after = retry_after
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._issues: Dict[str, dict] = {i["key"]: i for i in issues}
+        self._versao = 0
+        self._consultas: Dict[Any, List[dict]] = {}
+        self.stats: Dict[str, int] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # ---------- ciclo de vida ----------
+    def start(self) -> str:
+        fake = self
+
+        class Handler(_Handler):
+            jira = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-jira", daemon=True).start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # ---------- dados ----------
+    def _ordenadas(self) -> List[dict]:
+        return sorted(self._issues.values(), key=lambda i: i["fields"]["updated"], reverse=True)
+
+    def consultar(self, jql: str) -> List[dict]:
+        """Resultado do JQL, memoizado por (jql, versão dos dados) para paginar sem reavaliar."""
+        with self._lock:
+            ck = (jql, self._versao)
+            res = self._consultas.get(ck)
+            if res is None:
+                if len(self._consultas) > 64:
+                    self._consultas.clear()
+                pred = compilar_jql(jql)
+                res = self._consultas[ck] = [i for i in self._ordenadas() if pred(i)]
+            return res
+
+    def tocar(self, keys: List[str], status_id: Optional[str] = None):
+        """Marca issues como alteradas agora (e opcionalmente muda o status) — gera delta."""
+        agora = jira_dt(datetime.now(timezone.utc))
+        with self._lock:
+            for k in keys:
+                f = self._issues[k]["fields"]
+                f["updated"] = agora
+                if status_id:
+                    f["status"] = {"id": status_id, "name": STATUS_POR_ID[status_id]}
+            self._versao += 1
+
+    def transicionar(self, key: str, tid: str) -> bool:
+        with self._lock:
+            issue = self._issues.get(key)
+            if issue is None:
+                return False
+            t = next((t for t in transicoes(issue["fields"]["status"]["id"]) if t["id"] == str(tid)), None)
+            if t is None:
+                return False
+            issue["fields"]["status"] = dict(t["to"])
+            issue["fields"]["updated"] = jira_dt(datetime.now(timezone.utc))
+            self._versao += 1
+            return True
+
+    def issue(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._issues.get(key)
+
+    def contar(self, endpoint: str):
+        with self._lock:
+            self.stats[endpoint] = self.stats.get(endpoint, 0) + 1
+
+    def sortear_429(self) -> bool:
+        with self._lock:
+            return self.taxa_429 > 0 and self._rnd.random() < self.taxa_429
+
+
+class _Handler(BaseHTTPRequestHandler):
+    jira: FakeJira = None
+    protocol_version = "HTTP/1.1"  # keep-alive, como o Jira Cloud
+
+    def setup(self):
+        super().setup()
+        # cabeçalho e corpo saem em writes separados: sem TCP_NODELAY o Nagle soma ~40 ms por resposta
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    # ---------- resposta ----------
+    def _json(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}") if n else {}
+
+    def _antes(self, endpoint: str) -> bool:
+        """Latência + 429 sorteado; retorna False se já respondeu."""
+        self.jira.contar(endpoint)
+        if self.jira.latencia:
+            time.sleep(self.jira.latencia)
+        if self.jira.sortear_429():
+            self.jira.contar("429")
+            # consome o corpo não lido: na conexão keep-alive ele viraria o início da próxima requisição
+            n = int(self.headers.get("Content-Length") or 0)
+            if n:
+                self.rfile.read(n)
+            self._json(429, {"errorMessages": ["Rate limit exceeded"]},
+                       {"Retry-After": str(self.jira.retry_after)})
+            return False
+        return True
+
+    # ---------- rotas ----------
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/rest/api/3/myself":
+            if self._antes("myself"):
+                self._json(200, {"accountId": "bench", "displayName": "Benchmark", "emailAddress": "bench@local"})
+            return
+        m = re.fullmatch(r"/rest/api/3/issue/([^/]+)(/transitions)?", path)
+        if m:
+            key, trans = m.group(1), m.group(2)
+            if not self._antes("transitions" if trans else "issue"):
+                return
+            issue = self.jira.issue(key)
+            if issue is None:
+                self._json(404, {"errorMessages": ["Issue does not exist"]})
+            elif trans:
+                self._json(200, {"transitions": transicoes(issue["fields"]["status"]["id"])})
+            else:
+                self._json(200, {"key": key, "fields": {"status": issue["fields"]["status"]}})
+            return
+        self._json(404, {"errorMessages": [f"not found: {path}"]})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/rest/api/3/search/jql":
+            if not self._antes("search"):
+                return
+            body = self._body()
+            res = self.jira.consultar(body.get("jql", ""))
+            ini = int(body.get("nextPageToken") or 0)
+            fim = ini + max(1, min(int(body.get("maxResults") or 50), MAX_RESULTS))
+            fields = body.get("fields") or []
+            page = [
+                {"id": i["id"], "key": i["key"], "fields": {f: i["fields"].get(f) for f in fields}}
+                for i in res[ini:fim]
+            ]
+            out = {"issues": page, "isLast": fim >= len(res)}
+            if fim < len(res):
+                out["nextPageToken"] = str(fim)
+            self._json(200, out)
+            return
+        if path == "/rest/api/3/search/approximate-count":
+            if self._antes("count"):
+                self._json(200, {"count": len(self.jira.consultar(self._body().get("jql", "")))})
+            return
+        m = re.fullmatch(r"/rest/api/3/issue/([^/]+)/transitions", path)
+        if m:
+            if not self._antes("transition"):
+                return
+            tid = (self._body().get("transition") or {}).get("id")
+            if self.jira.transicionar(m.group(1), tid):
+                self._json(204)
+            else:
+                self._json(400, {"errorMessages": [f"Transition {tid} is not valid for this issue"]})
+            return
+        self._json(404, {"errorMessages": [f"not found: {path}"]})
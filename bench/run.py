@@ -0,0 +1,215 @@
+# bench/run.py
+"""
+Benchmark offline do pipeline de dados do painel contra o Jira local (bench.jira_fake).
+
+    python -m bench.run                          # 1k, 10k e 100k issues
+    python -m bench.run --sizes 1000 --latency-ms 50 --rate-429 0.05 --json bench.json
+
+Cada etapa do refresh (busca, sync full/delta, normalização, partições, agregados,
+duplicidade, mensagens, exportação, transições) é cronometrada por tamanho de base.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from utils.analytics import para_dataframe, resumo_por_loja, top_lojas, filtrar_destaques, serie_diaria
+from utils.export_utils import chamados_csv_buffer, chamados_xlsx_buffer
+from utils.jira_api import JiraAPI
+from utils.messages import MensagemCache, indice_duplicidade
+from utils.ratelimit import RateLimiter
+from utils.records import normalizar, loja_from_issue, chave_agenda
+from utils.store import IssueStore
+from utils.sync import IssueSync, SondaMudancas
+
+from .dataset import gerar_issues
+from .jira_fake import FakeJira
+
+# mesmos campos/JQLs do streamlit_app.py
+FIELDS = (
+    "summary,customfield_14954,customfield_14829,customfield_14825,"
+    "customfield_12374,customfield_12271,customfield_11993,"
+    "customfield_11994,customfield_11948,customfield_12036,customfield_12279,"
+    "status,created,resolutiondate,updated"
+)
+JQL_COMBINADA = "project = FSA AND status in (11499,11481,11500) ORDER BY updated DESC"
+JQL_ESCOPO = "project = FSA"
+JQL_SPARE = 'project = FSA AND status = "Aguardando Spare"'
+JQL_RESOLVIDOS_BASE = (
+    'project = FSA AND status in (11498, 10702, "Encerrado", "Resolvido") '
+    'AND resolutiondate >= "{from_iso}" AND resolutiondate <= "{to_iso}"'
+)
+FIELDS_RESOLVIDOS = "resolutiondate,status"
+JQL_RESOLVIDOS_SONDA = 'project = FSA AND status in (11498, 10702, "Encerrado", "Resolvido")'
+STATUS_VIEWS = {
+    11499: "AGENDAMENTO", "AGENDAMENTO": "AGENDAMENTO",
+    11481: "Agendado", "Agendado": "Agendado",
+    11500: "TEC-CAMPO", "TEC-CAMPO": "TEC-CAMPO",
+}
+
+
+class Cronometro:
+    """Acumula (tamanho, etapa) → segundos; `etapa()` é um context manager."""
+
+    def __init__(self):
+        self.linhas: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def etapa(self, tamanho: int, nome: str, **extra):
+        t0 = time.perf_counter()
+        info: Dict[str, Any] = dict(extra)
+        yield info
+        self.linhas.append({"n": tamanho, "etapa": nome, "s": time.perf_counter() - t0, **info})
+
+    def imprimir(self):
+        print(f"{'n':>8}  {'etapa':<34} {'ms':>10}  extra")
+        for l in self.linhas:
+            extra = {k: v for k, v in l.items() if k not in ("n", "etapa", "s")}
+            print(f"{l['n']:>8}  {l['etapa']:<34} {l['s'] * 1000:>10.1f}  {extra or ''}")
+
+
+def rodar(n: int, args, crono: Cronometro):
+    issues = gerar_issues(n, seed=args.seed)
+    fake = FakeJira(issues, latencia=args.latency_ms / 1000, taxa_429=args.rate_429, retry_after=args.retry_after)
+    url = fake.start()
+    limiter = RateLimiter(rate=args.rate, burst=args.rate * 2, max_concurrency=args.pool)
+    jira = JiraAPI("bench@local", "token", url, pool_size=args.pool, limiter=limiter)
+    tmp = tempfile.mkdtemp(prefix="fsa-bench-")
+    try:
+        # ---------- chamadas ao Jira ----------
+        with crono.etapa(n, "whoami") as e:
+            e["status"] = jira.whoami()[1]["status"]
+        with crono.etapa(n, "count_jql (combo)") as e:
+            e["count"] = jira.count_jql(JQL_COMBINADA).get("count")
+        with crono.etapa(n, "busca combo (enhanced)") as e:
+            raw, dbg = jira.buscar_chamados_enhanced(JQL_COMBINADA, FIELDS, page_size=args.page_size)
+            e.update(count=len(raw), pages=dbg.get("pages"), status=dbg.get("status"))
+        with crono.etapa(n, "busca resolvidos 90d") as e:
+            to_dt = datetime.now(timezone.utc)
+            jql_res = JQL_RESOLVIDOS_BASE.format(
+                from_iso=(to_dt - timedelta(days=90)).strftime("%Y-%m-%d %H:%M"),
+                to_iso=to_dt.strftime("%Y-%m-%d %H:%M"),
+            )
+            res_raw, dbg = jira.buscar_chamados_enhanced(jql_res, FIELDS_RESOLVIDOS, page_size=args.page_size)
+            e.update(count=len(res_raw), status=dbg.get("status"))
+        with crono.etapa(n, "spare (stream + projeção)") as e:
+            spare = defaultdict(list)
+            for loja, key in jira.iter_chamados(JQL_SPARE, "customfield_14954,status", page_size=500,
+                                                projetar=lambda i: (loja_from_issue(i), i["key"])):
+                spare[loja].append(key)
+            e["lojas"] = len(spare)
+
+        # ---------- sync incremental (com SQLite) ----------
+        store = IssueStore(os.path.join(tmp, "issues.sqlite3"))
+        sync = IssueSync(JQL_COMBINADA, JQL_ESCOPO, STATUS_VIEWS.keys(), store=store)
+        with crono.etapa(n, "sync full (+store)") as e:
+            chamados, dbg = sync.refresh(jira, FIELDS, page_size=args.page_size)
+            e.update(count=len(chamados), status=dbg.get("status"))
+        alterar = [ch.key for ch in chamados[: max(1, n // 100)]]
+        fake.tocar(alterar)
+        with crono.etapa(n, "sync delta (1% alterado)") as e:
+            chamados, dbg = sync.refresh(jira, FIELDS, page_size=args.page_size)
+            e.update(fetched=dbg.get("fetched"), changed=dbg.get("changed"), status=dbg.get("status"))
+        versao = sync.versao
+        with crono.etapa(n, "sync delta (sem mudança)") as e:
+            sync.refresh(jira, FIELDS, page_size=args.page_size)
+            e.update(changed=sync.versao != versao)
+        sonda = SondaMudancas()
+        for jql in (JQL_RESOLVIDOS_SONDA, JQL_SPARE):
+            sonda.confirmar(jql, jira.impressao_digital(jql))
+        with crono.etapa(n, "sonda sem mudança (res + spare)") as e:
+            e["mudou"] = [sonda.verificar(jira, jql, jql)[0] for jql in (JQL_RESOLVIDOS_SONDA, JQL_SPARE)]
+        with crono.etapa(n, "warm start (store → registros)") as e:
+            e["count"] = len(IssueSync(JQL_COMBINADA, JQL_ESCOPO, STATUS_VIEWS.keys(), store=store).issues)
+        store.close()
+
+        # ---------- pipeline local ----------
+        with crono.etapa(n, "normalizar (JSON → Chamado)"):
+            normalizar(res_raw)
+            normalizar(raw)
+        with crono.etapa(n, "particionar + agrupar"):
+            views = jira.particionar_por_status(chamados, STATUS_VIEWS)
+            agrup_pend = jira.agrupar_chamados(views["AGENDAMENTO"])
+            agrup_tec = jira.agrupar_chamados(views["TEC-CAMPO"])
+        with crono.etapa(n, "agenda (chave_agenda)"):
+            grouped_sched = defaultdict(lambda: defaultdict(list))
+            for ch in views["Agendado"]:
+                grouped_sched[chave_agenda(ch)][ch.loja].append(ch)
+            sorted(grouped_sched.items())
+        with crono.etapa(n, "agregados (pandas)") as e:
+            df = para_dataframe(chamados)
+            por_loja = resumo_por_loja(df)
+            top_lojas(por_loja, 5)
+            filtrar_destaques(por_loja, 2)
+            serie_diaria(df["created"], 30)
+            e["lojas"] = len(por_loja)
+        with crono.etapa(n, "índice de duplicidade") as e:
+            e["grupos"] = len(indice_duplicidade(chamados))
+        mensagens = MensagemCache()
+        with crono.etapa(n, "mensagens (frio)"):
+            mensagens.texto_unico(agrup_pend)
+            mensagens.texto_unico(agrup_tec)
+        with crono.etapa(n, "mensagens (cache quente)"):
+            mensagens.texto_unico(agrup_pend)
+            mensagens.texto_unico(agrup_tec)
+        with crono.etapa(n, "export CSV") as e:
+            e["bytes"] = len(chamados_csv_buffer(chamados).getvalue())
+        with crono.etapa(n, "export XLSX") as e:
+            e["bytes"] = len(chamados_xlsx_buffer(chamados).getvalue())
+
+        # ---------- transições ----------
+        with crono.etapa(n, "catálogo de transições") as e:
+            amostras = {}
+            for ch in chamados:
+                amostras.setdefault(ch.status, ch.key)
+            e["status"] = jira.precarregar_transicoes(amostras)
+        lote = [ch.key for ch in views["AGENDAMENTO"][: args.transitions]]
+        with crono.etapa(n, f"transições em massa ({len(lote)})") as e:
+            res = jira.transicionar_em_massa(
+                {k: [{"nome": "agendar", "match": lambda t: t["to"]["name"] == "Agendado"}] for k in lote},
+                status_atual={k: "AGENDAMENTO" for k in lote},
+            )
+            e["ok"] = sum(1 for r in res.values() if r["ok"])
+
+        crono.linhas.append({"n": n, "etapa": "— servidor", "s": 0.0, **fake.stats,
+                             "rate_limit": limiter.info(), "pool": jira.pool_stats()})
+        crono.linhas.append({"n": n, "etapa": "— jira (p50/p90 ms)", "s": 0.0, **{
+            f"{r['method']} {r['endpoint']}": f"{r['p50_ms']}/{r['p90_ms']}" for r in jira.telemetria.resumo()
+        }})
+    finally:
+        jira.close()
+        fake.stop()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sizes", default="1000,10000,100000", help="tamanhos da base (vírgula)")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="latência por requisição no Jira local")
+    p.add_argument("--rate-429", type=float, default=0.0, help="fração de respostas 429 (0..1)")
+    p.add_argument("--retry-after", type=float, default=0.0, help="Retry-After enviado nos 429 (s)")
+    p.add_argument("--page-size", type=int, default=600)
+    p.add_argument("--pool", type=int, default=10)
+    p.add_argument("--rate", type=float, default=1000.0, help="req/s do RateLimiter do cliente")
+    p.add_argument("--transitions", type=int, default=50)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--json", help="grava os resultados neste arquivo")
+    args = p.parse_args(argv)
+
+    crono = Cronometro()
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        print(f"[bench] {n} issues…", file=sys.stderr)
+        rodar(n, args, crono)
+    crono.imprimir()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(crono.linhas, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
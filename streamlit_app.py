@@ -4,15 +4,13 @@
 # Mantém: JiraAPI.buscar_chamados_enhanced, whoami, debug sidebar, expandidos por loja,
 # heatmap gratuito via Nominatim, filtros e KPIs, e transições (inclui TEC-CAMPO).
 
-import io
-import csv
+import json
 import os
-import time
-import requests
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 
 import pandas as pd
+import pydeck as pdk
 import streamlit as st
 
 # ==== Config da página ====
@@ -52,7 +50,20 @@ if "presets" not in st.session_state:
 
 # ==== Imports da sua base util ====
 from utils.jira_api import JiraAPI
-from utils.messages import gerar_mensagem, verificar_duplicidade
+from utils.messages import MensagemCache, indice_duplicidade
+from utils.sync import IssueSync, SondaMudancas
+from utils.cache import SharedCache
+from utils.ratelimit import RateLimiter
+from utils.worker import RefreshWorker
+from utils.store import IssueStore
+from utils.geocode import GeocodeStore, Geocoder, FilaGeocode, agregar_pontos
+from utils.records import normalizar, loja_from_issue, chave_agenda
+from utils.export_utils import chamados_csv_buffer, chamados_xlsx_buffer, chamados_pdf_buffer
+from utils.analytics import para_dataframe, resumo_por_loja, top_lojas, filtrar_destaques, serie_diaria
+from utils.telemetry import Fases
+
+# tempos por fase desta execução do script (painel "Profiling" na sidebar)
+fases = Fases()
 
 # ==== Credenciais (secrets) ====
 EMAIL = st.secrets.get("EMAIL", "")
@@ -67,24 +78,37 @@ if USE_EX_API and not CLOUD_ID:
     st.error("⚠️ `USE_EX_API=true`, mas faltou `CLOUD_ID` em secrets.")
     st.stop()
 
-jira = JiraAPI(
-    EMAIL,
-    API_TOKEN,
-    "https://delfia.atlassian.net",
-    use_ex_api=USE_EX_API,
-    cloud_id=CLOUD_ID,
-)
-
-# ==== Autenticação rápida ====
-who, dbg_who = jira.whoami()
-if not who:
-    st.error(
-        "❌ Falha de autenticação no Jira.\n\n"
-        f"- URL: `{dbg_who.get('url')}`\n"
-        f"- Status: `{dbg_who.get('status')}`\n"
-        f"- Erro: `{dbg_who.get('error')}`"
+JIRA_POOL_SIZE = int(st.secrets.get("JIRA_POOL_SIZE", 10))
+JIRA_CONNECT_TIMEOUT = float(st.secrets.get("JIRA_CONNECT_TIMEOUT", 5))
+JIRA_READ_TIMEOUT = float(st.secrets.get("JIRA_READ_TIMEOUT", 30))
+JIRA_RATE = float(st.secrets.get("JIRA_RATE", 10))
+CACHE_TTL = float(st.secrets.get("CACHE_TTL", 60))
+REFRESH_INTERVAL = float(st.secrets.get("REFRESH_INTERVAL", 60))
+STORE_PATH = st.secrets.get("STORE_PATH", os.path.join(".cache", "fsa_issues.sqlite3"))
+GEOCODE_PATH = st.secrets.get("GEOCODE_PATH", os.path.join(".cache", "geocode.sqlite3"))
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache(ttl):
+    # um cache por processo (whoami): as buscas já são feitas uma vez só, pelo worker
+    return SharedCache(ttl=ttl)
+
+@st.cache_resource(show_spinner=False)
+def get_jira(email, api_token, use_ex_api, cloud_id, pool_size, connect_timeout, read_timeout, rate):
+    # instância única por processo: o pool keep-alive sobrevive aos reruns
+    return JiraAPI(
+        email,
+        api_token,
+        "https://delfia.atlassian.net",
+        use_ex_api=use_ex_api,
+        cloud_id=cloud_id,
+        pool_size=pool_size,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        limiter=RateLimiter(rate=rate, burst=max(1, int(rate * 2)), max_concurrency=pool_size),
     )
-    st.stop()
+
+jira = get_jira(EMAIL, API_TOKEN, USE_EX_API, CLOUD_ID, JIRA_POOL_SIZE, JIRA_CONNECT_TIMEOUT, JIRA_READ_TIMEOUT, JIRA_RATE)
+cache = get_shared_cache(CACHE_TTL)
 
 # ==== Campos a buscar ====
 FIELDS = (
@@ -94,167 +118,352 @@ FIELDS = (
     "status,created,resolutiondate,updated"
 )
 
-# ==== JQLs (mantidos) ====
-JQL_PEND = 'project = FSA AND status = "AGENDAMENTO" ORDER BY updated DESC'
-JQL_AG   = 'project = FSA AND status = "Agendado" ORDER BY updated DESC'
-JQL_TC   = 'project = FSA AND status = "TEC-CAMPO" ORDER BY updated DESC'
-
+# ==== JQL (uma única busca combinada, particionada localmente por status) ====
 # IDs confirmados para visão combinada (não mude se já conferiu)
 STATUS_ID_AGENDAMENTO = 11499
 STATUS_ID_AGENDADO    = 11481
 STATUS_ID_TEC_CAMPO   = 11500
 JQL_COMBINADA = (
-    f"project = FSA AND status in ({STATUS_ID_AGENDAMENTO},{STATUS_ID_AGENDADO},{STATUS_ID_TEC_CAMPO})"
+    f"project = FSA AND status in ({STATUS_ID_AGENDAMENTO},{STATUS_ID_AGENDADO},{STATUS_ID_TEC_CAMPO}) "
+    "ORDER BY updated DESC"
 )
 
-# Resolvidos para o gráfico
+# id/nome do status → visão (pendentes / agendados / tec-campo)
+STATUS_VIEWS = {
+    STATUS_ID_AGENDAMENTO: "AGENDAMENTO", "AGENDAMENTO": "AGENDAMENTO",
+    STATUS_ID_AGENDADO: "Agendado", "Agendado": "Agendado",
+    STATUS_ID_TEC_CAMPO: "TEC-CAMPO", "TEC-CAMPO": "TEC-CAMPO",
+}
+
+# Spare: uma única busca por refresh, indexada por código de loja
+JQL_SPARE = 'project = FSA AND status = "Aguardando Spare"'
+FIELDS_SPARE = "customfield_14954,status"
+SPARE_PAGINA = 500
+
+# Escopo do delta sync (sem filtro de status, para detectar saídas dos status acompanhados)
+JQL_ESCOPO = "project = FSA"
+
+# Resolvidos para o gráfico (busca a janela máxima do slider; o corte por dias é local).
+# A sonda de mudança usa o mesmo filtro sem a janela de datas (que muda a cada minuto).
+RESOLVIDOS_MAX_DIAS = 90
 JQL_RESOLVIDOS_BASE = (
     'project = FSA AND status in (11498, 10702, "Encerrado", "Resolvido") '
     'AND resolutiondate >= "{from_iso}" AND resolutiondate <= "{to_iso}"'
 )
+JQL_RESOLVIDOS_SONDA = 'project = FSA AND status in (11498, 10702, "Encerrado", "Resolvido")'
+# o gráfico só lê `resolution`: a janela de 90 dias vem sem o resto da projeção
+FIELDS_RESOLVIDOS = "resolutiondate,status"
+
+# Heatmap: rótulo → (tamanho da célula da grade em graus ou None = uma linha por loja, zoom inicial)
+MAPA_AGRUPAMENTOS = {
+    "Por loja": (None, 4),
+    "Grade ~5 km": (0.05, 9),
+    "Grade ~25 km": (0.25, 7),
+    "Grade ~100 km": (1.0, 5),
+}
+
+# Exportação do backlog: rótulo → (função, extensão, mime)
+EXPORTADORES = {
+    "CSV": (chamados_csv_buffer, "csv", "text/csv"),
+    "XLSX": (chamados_xlsx_buffer, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "PDF": (chamados_pdf_buffer, "pdf", "application/pdf"),
+}
+
+# Lojas (expanders) por página nas sub-abas de Chamados
+LOJAS_POR_PAGINA = 25
+
+# ==== Carga em background (worker do processo) ====
+# O worker busca, normaliza e publica um snapshot; o script só lê o snapshot mais recente,
+# então digitar num filtro ou abrir um expander não espera nenhuma chamada ao Jira.
+def carregar_spare_por_loja():
+    # reduz cada página ao par (loja, key) conforme chega, sem guardar o JSON bruto;
+    # via buscar_chamados_enhanced para retomar do nextPageToken se uma página levar 429
+    pares, dbg = jira.buscar_chamados_enhanced(JQL_SPARE, FIELDS_SPARE, page_size=SPARE_PAGINA,
+                                               projetar=lambda i: (loja_from_issue(i), i["key"]))
+    idx = defaultdict(list)
+    for loja, key in pares:
+        idx[loja].append(key)
+    return dict(idx), dbg
+
+def busca_completa(dbg):
+    return dbg.get("status") == 200 and not dbg.get("partial")
+
+def carregar_snapshot(sync_combo, sonda, anterior=None):
+    """
+    Uma carga do worker. A visão combinada vem do delta do IssueSync (uma busca pequena);
+    resolvidos, que seriam repaginados inteiros, passam antes por uma sonda (approximate-count
+    + updated mais recente). Spare só é sondado se a última busca passou de uma página — com
+    uma página só, a sonda (2 requisições) custa mais que buscar de novo. O que não mudou desde
+    a última carga publicada é reaproveitado do snapshot anterior, inclusive a `versao` das
+    visões derivadas.
+    """
+    prev = anterior.data if anterior is not None and anterior.data else None
+    to_dt = datetime.now(timezone.utc)
+    from_dt = to_dt - timedelta(days=RESOLVIDOS_MAX_DIAS)
+    jql_res = JQL_RESOLVIDOS_BASE.format(
+        from_iso=from_dt.strftime("%Y-%m-%d %H:%M"),
+        to_iso=to_dt.strftime("%Y-%m-%d %H:%M")
+    )
+    tempos = Fases()
+    sondar = {"res": lambda: sonda.verificar(jira, "res", JQL_RESOLVIDOS_SONDA)}
+    if prev is not None and prev["spare"][1].get("pages", 0) > 1:
+        sondar["spare"] = lambda: sonda.verificar(jira, "spare", JQL_SPARE)
+    else:
+        sonda.esquecer("spare")
+    with tempos.span("probe"):
+        sondas = jira.executar_concorrente(sondar)
+    mudou = {k: prev is None or m for k, (m, _imp) in sondas.items()}
+    mudou.setdefault("spare", True)
+
+    buscas = {
+        "who": lambda: cache.get(("whoami",), jira.whoami, aceitar=lambda r: bool(r[0]))[0],
+        "combo": lambda: sync_combo.refresh(jira, FIELDS, page_size=600),
+    }
+    if mudou["res"]:
+        buscas["res"] = lambda: jira.buscar_chamados_enhanced(jql_res, FIELDS_RESOLVIDOS, page_size=600)
+    if mudou["spare"]:
+        buscas["spare"] = carregar_spare_por_loja
+    with tempos.span("fetch"):
+        res = jira.executar_concorrente(buscas)
+
+    # delta sem alterações/remoções (ou que falhou): o conjunto do IssueSync é o mesmo já publicado
+    combo_raw, dbg_combo = res["combo"]
+    mudou["combo"] = prev is None or sync_combo.versao != prev.get("versao")
+
+    out = {"who": res["who"], "probe": {k: ("changed" if m else "unchanged") for k, m in mudou.items()}}
+    confirmar = []
+    # catálogo de transições: uma issue de exemplo por status (só busca o que ainda não está em cache)
+    with tempos.span("transitions"):
+        amostras = {}
+        for ch in combo_raw:
+            amostras.setdefault(ch.status, ch.key)
+        jira.precarregar_transicoes(amostras)
+    if mudou["combo"]:
+        with tempos.span("normalize"):
+            chamados = normalizar(combo_raw)
+        with tempos.span("duplicates"):
+            duplicados = indice_duplicidade(chamados)
+        out.update({
+            # JSON bruto → registros compactos (parse único de campos e datas por carga)
+            "chamados": chamados, "duplicados": duplicados, "versao": sync_combo.versao,
+        })
+    else:
+        out.update({k: prev[k] for k in ("chamados", "duplicados", "versao")})
+    out["dbg_combo"] = {"count": len(combo_raw or []), **dbg_combo}
+    # busca que falhou (ou voltou parcial) não substitui o que já estava publicado
+    res_ok = mudou["res"] and busca_completa(res["res"][1])
+    if res_ok or (mudou["res"] and prev is None):
+        resolvidos_raw, dbg_res = res["res"]
+        with tempos.span("normalize"):
+            out["resolvidos"] = normalizar(resolvidos_raw)
+        out["dbg_res"] = {"count": len(resolvidos_raw or []), **dbg_res}
+        if res_ok:
+            confirmar.append("res")
+    else:
+        out.update({k: prev[k] for k in ("resolvidos", "dbg_res")})
+    spare_ok = mudou["spare"] and busca_completa(res["spare"][1])
+    if spare_ok or (mudou["spare"] and prev is None):
+        out["spare"] = res["spare"]
+        if spare_ok and "spare" in sondas:
+            confirmar.append("spare")
+    else:
+        out["spare"] = prev["spare"]
+
+    # só agora (resultado completo montado) as impressões tiradas antes das buscas valem
+    for k in confirmar:
+        sonda.confirmar(k, sondas[k][1])
+    out["tempos"] = tempos.resultado()
+    return out
+
+@st.cache_resource(show_spinner=False)
+def get_mensagens():
+    # mensagens renderizadas por (loja, keys, updated): compartilhadas entre sessões e reruns
+    return MensagemCache()
+
+mensagens = get_mensagens()
+
+@st.cache_resource(show_spinner=False)
+def get_store(path):
+    return IssueStore(path)
+
+@st.cache_resource(show_spinner=False)
+def get_sonda():
+    # impressões digitais (count + updated mais recente) da última carga publicada
+    return SondaMudancas()
+
+@st.cache_resource(show_spinner=False)
+def get_worker(interval, store_path):
+    store = get_store(store_path)
+    sync_combo = IssueSync(JQL_COMBINADA, JQL_ESCOPO, STATUS_VIEWS.keys(), store=store)
+    sonda = get_sonda()
+    worker = RefreshWorker(lambda: carregar_snapshot(sync_combo, sonda, worker.snapshot()), interval=interval)
+    if sync_combo.issues:
+        # warm start: serve o que ficou no disco enquanto o primeiro delta roda
+        worker.publicar({
+            "who": None,
+            "chamados": sync_combo.snapshot(), "dbg_combo": {"source": "store", "count": len(sync_combo.issues)},
+            "duplicados": indice_duplicidade(sync_combo.issues.values()), "versao": sync_combo.versao,
+            "resolvidos": [], "dbg_res": {"source": "store"},
+            "spare": ({}, {"source": "store"}),
+            "tempos": {},
+        }, created_at=sync_combo.last_sync)
+    return worker.start()
+
+store = get_store(STORE_PATH)
+worker = get_worker(REFRESH_INTERVAL, STORE_PATH)
+sonda = get_sonda()
 
-# ==== Helpers de parsing ====
-def parse_dt(dt_str: str):
-    if not dt_str:
-        return None
-    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
-        try:
-            return datetime.strptime(dt_str, fmt).astimezone(timezone.utc)
-        except Exception:
-            pass
-    return None
-
-def loja_from_issue(issue):
-    f = issue.get("fields", {}) or {}
-    return (f.get("customfield_14954") or {}).get("value") or "Loja Desconhecida"
-
-def cidade_from_issue(issue):
-    return (issue.get("fields", {}) or {}).get("customfield_11994") or ""
-
-def uf_from_issue(issue):
-    return ((issue.get("fields", {}) or {}).get("customfield_11948") or {}).get("value") or ""
-
-def cep_from_issue(issue):
-    return (issue.get("fields", {}) or {}).get("customfield_11993") or ""
-
-def endereco_from_issue(issue):
-    return (issue.get("fields", {}) or {}).get("customfield_12271") or ""
-
-def updated_from_issue(issue):
-    return parse_dt((issue.get("fields", {}) or {}).get("updated"))
-
-def created_from_issue(issue):
-    return parse_dt((issue.get("fields", {}) or {}).get("created"))
-
-def resolutiondate_from_issue(issue):
-    return parse_dt((issue.get("fields", {}) or {}).get("resolutiondate"))
-
-def is_loja_critica(loja_data):
-    qtd = loja_data.get("qtd", 0)
-    last_upd = loja_data.get("last_updated")
-    stale = False
-    if last_upd:
-        stale = (datetime.now(timezone.utc) - last_upd) > timedelta(days=7)
-    return (qtd >= 5) or stale
-
-# ==== Buscas (mantidas com seu Enhanced) ====
-pendentes_raw, dbg_pend = jira.buscar_chamados_enhanced(JQL_PEND, FIELDS, page_size=200)
-agendados_raw, dbg_ag   = jira.buscar_chamados_enhanced(JQL_AG,   FIELDS, page_size=200)
-tec_raw,      dbg_tc    = jira.buscar_chamados_enhanced(JQL_TC,   FIELDS, page_size=300)
-combo_raw,    dbg_combo = jira.buscar_chamados_enhanced(JQL_COMBINADA, FIELDS, page_size=600)
-
-# Janela para tendência
-days_window = int(st.session_state.filters["days"])
-to_dt = datetime.now(timezone.utc)
-from_dt = to_dt - timedelta(days=days_window)
-jql_res = JQL_RESOLVIDOS_BASE.format(
-    from_iso=from_dt.strftime("%Y-%m-%d %H:%M"),
-    to_iso=to_dt.strftime("%Y-%m-%d %H:%M")
-)
-resolvidos_raw, dbg_res = jira.buscar_chamados_enhanced(jql_res, FIELDS, page_size=600)
+with st.sidebar:
+    if st.button("🔄 Atualizar agora"):
+        _seq = worker.snapshot().seq if worker.snapshot() else 0
+        sonda.esquecer()
+        worker.trigger()
+        with st.spinner("Atualizando dados do Jira…"):
+            worker.wait_for(_seq, timeout=60)
+
+fases.etapa("fetch")
+with st.spinner("Carregando chamados do Jira…"):
+    snap = worker.snapshot(wait=120)
+if snap is None or snap.data is None:
+    st.error(f"❌ Não foi possível carregar os dados do Jira. {getattr(snap, 'error', '') or ''}")
+    st.stop()
+
+# ==== Autenticação rápida (snapshot do disco ainda não passou pelo whoami) ====
+who, dbg_who = snap.data["who"] or (True, {})
+if not who:
+    st.error(
+        "❌ Falha de autenticação no Jira.\n\n"
+        f"- URL: `{dbg_who.get('url')}`\n"
+        f"- Status: `{dbg_who.get('status')}`\n"
+        f"- Erro: `{dbg_who.get('error')}`"
+    )
+    st.stop()
+
+chamados = snap.data["chamados"]
+resolvidos = snap.data["resolvidos"]
+spare_por_loja, dbg_spare = snap.data["spare"]
+dbg_combo = snap.data["dbg_combo"]
+dbg_res = snap.data["dbg_res"]
+snap_dt = datetime.fromtimestamp(snap.created_at)
+
+fases.etapa("group")
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def derivar_visoes(versao, _chamados, _duplicados):
+    """
+    Partições, agrupamentos e agregados de um conjunto de chamados, calculados uma vez por
+    `versao` (muda só quando a carga trouxe dados novos) e compartilhados entre sessões/reruns.
+    Somente leitura para quem usa.
+    """
+    views = jira.particionar_por_status(_chamados, STATUS_VIEWS)
+    grouped = defaultdict(lambda: defaultdict(list))
+    for ch in views["Agendado"]:
+        # chave (ordenável, rótulo): sorted() fica em ordem cronológica
+        grouped[chave_agenda(ch)][ch.loja].append(ch)
+    df = para_dataframe(_chamados)
+    resumo = resumo_por_loja(df)
+    return {
+        "views": views,
+        "status_por_key": {ch.key: ch.status for ch in _chamados},
+        # duplicidade (loja, PDV, ativo) em todo o backlog: índice montado uma vez por carga no worker
+        "dup_por_key": {key: grupo for grupo in _duplicados.values() for key in grupo},
+        "agrup_pend": jira.agrupar_chamados(views["AGENDAMENTO"]),
+        "grouped_sched": grouped,
+        "agrup_tec": jira.agrupar_chamados(views["TEC-CAMPO"]),
+        "df_chamados": df,
+        "por_loja": resumo,
+        "critica_por_loja": resumo["critica"].to_dict(),
+        "top_list": top_lojas(resumo, 5),
+    }
+
+duplicados = snap.data["duplicados"]
+_derivadas = derivar_visoes(snap.data.get("versao") or snap.created_at, chamados, duplicados)
+_views = _derivadas["views"]
+pendentes = _views["AGENDAMENTO"]
+agendados = _views["Agendado"]
+tec_campo = _views["TEC-CAMPO"]
+status_por_key = _derivadas["status_por_key"]
+dup_por_key = _derivadas["dup_por_key"]
+
+def keys_duplicadas(iss):
+    return [ch.key for ch in iss if ch.key in dup_por_key]
+
+def tag_str(*tags):
+    tags = [t for t in tags if t]
+    return f" [{' • '.join(tags)}]" if tags else ""
+
+def baixar_mensagens(gerar_texto, nome):
+    # modo em lote: todas as mensagens da aba num .txt — só monta o texto se o usuário pedir
+    if st.toggle("Preparar todas as mensagens (lote)", key=f"lote_{nome}"):
+        st.download_button(
+            "⬇️ Baixar todas as mensagens", data=gerar_texto().encode("utf-8"),
+            file_name=f"mensagens_{nome}_{datetime.now():%Y%m%d_%H%M%S}.txt", mime="text/plain", key=f"msgs_{nome}",
+        )
+
+def filtrar_lojas(itens, filtro):
+    """(loja, [Chamado]) cujo código de loja ou alguma cidade contém `filtro` — antes de renderizar."""
+    filtro = (filtro or "").strip().lower()
+    if not filtro:
+        return list(itens)
+    return [(loja, iss) for loja, iss in itens
+            if filtro in loja.lower() or any(filtro in (ch.cidade or "").lower() for ch in iss)]
+
+def paginar(itens, nome):
+    """Fatia da página atual; só as lojas desta página viram expanders (e mensagens)."""
+    total = len(itens)
+    paginas = max(1, -(-total // LOJAS_POR_PAGINA))
+    pagina = 1
+    if paginas > 1:
+        pagina = int(st.number_input(f"Página (1–{paginas})", min_value=1, max_value=paginas, value=1,
+                                     step=1, key=f"pag_{nome}_{paginas}"))
+    ini = (pagina - 1) * LOJAS_POR_PAGINA
+    fim = min(total, ini + LOJAS_POR_PAGINA)
+    if paginas > 1:
+        st.caption(f"Lojas {ini + 1}–{fim} de {total}")
+    return itens[ini:fim]
 
 # ==== Agrupamentos ====
-agrup_pend = jira.agrupar_chamados(pendentes_raw)
-
-grouped_sched = defaultdict(lambda: defaultdict(list))
-if agendados_raw:
-    for issue in agendados_raw:
-        f = issue.get("fields", {}) or {}
-        loja = (f.get("customfield_14954") or {}).get("value") or "Loja Desconhecida"
-        raw_dt = f.get("customfield_12036")
-        data_str = "Não definida"
-        if raw_dt:
-            try:
-                data_str = datetime.strptime(raw_dt, "%Y-%m-%dT%H:%M:%S.%f%z").strftime("%d/%m/%Y")
-            except Exception:
-                data_str = str(raw_dt)
-        grouped_sched[data_str][loja].append(issue)
-
-agrup_tec = jira.agrupar_chamados(tec_raw)
-
-raw_by_loja = defaultdict(list)
-for i in (pendentes_raw or []) + (agendados_raw or []) + (tec_raw or []):
-    raw_by_loja[loja_from_issue(i)].append(i)
+agrup_pend = _derivadas["agrup_pend"]
+grouped_sched = _derivadas["grouped_sched"]
+agrup_tec = _derivadas["agrup_tec"]
 
 # ==== Construções de visão geral / destaques ====
-kpi = {"AGENDAMENTO": 0, "Agendado": 0, "TEC-CAMPO": 0}
-for issue in combo_raw or []:
-    fields = issue.get("fields") or {}
-    status_name = (fields.get("status") or {}).get("name")
-    if status_name in kpi:
-        kpi[status_name] += 1
-
-contagem_por_loja = {}
-for issue in combo_raw or []:
-    loja = loja_from_issue(issue)
-    cidade = cidade_from_issue(issue)
-    uf = uf_from_issue(issue)
-    upd = updated_from_issue(issue)
-    if loja not in contagem_por_loja:
-        contagem_por_loja[loja] = {
-            "cidade": cidade, "uf": uf, "qtd": 0, "last_updated": upd,
-            "endereco": endereco_from_issue(issue), "cep": cep_from_issue(issue)
-        }
-    contagem_por_loja[loja]["qtd"] += 1
-    if cidade and not contagem_por_loja[loja]["cidade"]:
-        contagem_por_loja[loja]["cidade"] = cidade
-    if uf and not contagem_por_loja[loja]["uf"]:
-        contagem_por_loja[loja]["uf"] = uf
-    if upd and (contagem_por_loja[loja]["last_updated"] is None or upd > contagem_por_loja[loja]["last_updated"]):
-        contagem_por_loja[loja]["last_updated"] = upd
-    if not contagem_por_loja[loja]["endereco"] and endereco_from_issue(issue):
-        contagem_por_loja[loja]["endereco"] = endereco_from_issue(issue)
-    if not contagem_por_loja[loja]["cep"] and cep_from_issue(issue):
-        contagem_por_loja[loja]["cep"] = cep_from_issue(issue)
-
-top_list = sorted(
-    [
-        {
-            "loja": loja,
-            "cidade": data["cidade"],
-            "uf": data["uf"],
-            "qtd": data["qtd"],
-            "last_updated": data["last_updated"],
-            "critica": is_loja_critica(data),
-        }
-        for loja, data in contagem_por_loja.items()
-    ],
-    key=lambda x: (-x["qtd"], x["loja"])
-)[:5]
+fases.etapa("aggregate")
+kpi = {view: len(items) for view, items in _views.items()}
+
+df_chamados = _derivadas["df_chamados"]
+por_loja = _derivadas["por_loja"]
+critica_por_loja = _derivadas["critica_por_loja"]
+top_list = _derivadas["top_list"]
+
+# ==== Transições em massa ====
+def barra_progresso(label):
+    bar = st.progress(0.0, text=label)
+    def _cb(feitos, total, key, _res):
+        bar.progress(feitos / total, text=f"{label} {feitos}/{total} ({key})")
+    return _cb
+
+def para_status(nome):
+    alvo = (nome or "").lower()
+    return lambda t: ((t.get("to", {}) or {}).get("name") or "").lower() == alvo
 
 # ==== Sidebar – Ações + Debug ====
+fases.etapa("sidebar")
 with st.sidebar:
     st.header("Ações")
     if st.button("↩️ Desfazer última ação"):
         if st.session_state.history:
             action = st.session_state.history.pop()
-            reverted = 0
-            for key in action["keys"]:
-                trans = jira.get_transitions(key)
-                rev_id = next((t["id"] for t in trans if (t.get("to", {}) or {}).get("name") == action["from"]), None)
-                if rev_id and jira.transicionar_status(key, rev_id).status_code == 204:
-                    reverted += 1
+            passo = {"nome": "desfazer", "match": para_status(action["from"])}
+            resultado = jira.transicionar_em_massa(
+                {key: [passo] for key in action["keys"]},
+                progresso=barra_progresso("Revertendo"),
+                status_atual={key: action.get("to") for key in action["keys"] if action.get("to")},
+            )
+            reverted = sum(1 for r in resultado.values() if r["passos"][0]["status"] == 204)
             st.success(f"Revertido: {reverted} FSAs → {action['from']}")
+            sonda.esquecer()
+            worker.trigger()
         else:
             st.info("Nenhuma ação para desfazer.")
 
@@ -274,11 +483,19 @@ with st.sidebar:
     with st.expander("🛠️ Debug (Enhanced Search)"):
         st.json({
             "use_ex_api": USE_EX_API, "cloud_id": CLOUD_ID,
-            "pendentes": {"count": len(pendentes_raw or []), **dbg_pend},
-            "agendados": {"count": len(agendados_raw or []), **dbg_ag},
-            "tec_campo": {"count": len(tec_raw or []), **dbg_tc},
-            "combo": {"count": len(combo_raw or []), **dbg_combo},
-            "resolvidos": {"count": len(resolvidos_raw or []), **dbg_res},
+            "snapshot": {"seq": snap.seq, "age_s": round(snap.age, 1),
+                         "duration_s": round(snap.duration, 2), "error": snap.error},
+            "combo": dbg_combo,
+            "partições": {view: len(items) for view, items in _views.items()},
+            "spare": {"lojas": len(spare_por_loja), **dbg_spare},
+            "resolvidos": dbg_res,
+            "pool": jira.pool_stats(),
+            "rate_limit": jira.limiter.info(),
+            "store": store.info(),
+            "transições (cache)": jira.transicoes_info(),
+            "cache": cache.info(),
+            "sonda": {"última carga": snap.data.get("probe"), **sonda.info()},
+            "mensagens": mensagens.info(),
             "last_call": {
                 "url": getattr(jira, "last_url", None),
                 "method": getattr(jira, "last_method", None),
@@ -307,50 +524,50 @@ with st.sidebar:
                     "content": [{"type": "paragraph", "content": [{"type": "text", "text": tecnico}]}],
                 }
 
-            keys_pend  = [i["key"] for i in (pendentes_raw or []) if loja_from_issue(i) == loja_sel]
-            keys_sched = [i["key"] for i in (agendados_raw or [])  if loja_from_issue(i) == loja_sel]
+            keys_pend  = store.keys(status=[STATUS_ID_AGENDAMENTO], loja=loja_sel)
+            keys_sched = store.keys(status=[STATUS_ID_AGENDADO], loja=loja_sel)
             all_keys = keys_pend + keys_sched
 
             if st.button(f"Agendar e mover {len(all_keys)} FSAs → Tec-Campo"):
-                errors, moved = [], 0
+                # por FSA, em ordem: 1) agendar (só pendentes) → 2) mover para Tec-Campo
+                passo_ag = {"nome": "agendar", "fields": extra_ag,
+                            "match": lambda t: "agend" in t["name"].lower()}
+                passo_tc = {"nome": "tec-campo",
+                            "match": lambda t: "tec-campo" in ((t.get("to", {}) or {}).get("name") or "").lower()}
+                plano = {k: [passo_ag, passo_tc] for k in keys_pend}
+                plano.update({k: [passo_tc] for k in keys_sched})
+
+                resultado = jira.transicionar_em_massa(
+                    plano, progresso=barra_progresso("Transicionando"),
+                    status_atual={k: status_por_key.get(k) for k in plano if status_por_key.get(k)},
+                )
 
-                # 1) Agendar pendentes
-                for k in keys_pend:
-                    trans = jira.get_transitions(k)
-                    agid = next((t["id"] for t in trans if "agend" in t["name"].lower()), None)
-                    if agid:
-                        r = jira.transicionar_status(k, agid, fields=extra_ag)
-                        if r.status_code != 204:
-                            errors.append(f"{k}⏳{r.status_code}")
-
-                # 2) Mover todos para Tec-Campo
-                for k in all_keys:
-                    trans = jira.get_transitions(k)
-                    tcid = next((t["id"] for t in trans if "tec-campo" in (t.get("to", {}) or {}).get("name", "").lower()), None)
-                    if tcid:
-                        r = jira.transicionar_status(k, tcid)
-                        if r.status_code == 204:
-                            moved += 1
-                        else:
-                            errors.append(f"{k}➡️{r.status_code}")
+                errors, moved = [], 0
+                for k, res in resultado.items():
+                    for p in res["passos"]:
+                        if p["status"] in (204, "skip"):
+                            if p["nome"] == "tec-campo" and p["status"] == 204:
+                                moved += 1
+                            continue
+                        errors.append(f"{k}{'⏳' if p['nome'] == 'agendar' else '➡️'}{p['status']}")
 
                 if errors:
                     st.error("Erros:")
                     [st.code(e) for e in errors]
                 else:
                     st.success(f"{len(all_keys)} FSAs agendados e movidos → Tec-Campo")
-                    st.session_state.history.append({"keys": all_keys, "from": "AGENDADO"})
+                    st.session_state.history.append({"keys": all_keys, "from": "AGENDADO", "to": "TEC-CAMPO"})
+                sonda.esquecer()
+                worker.trigger()
 
         else:
             # fluxo manual
-            opts = (
-                [i["key"] for i in (pendentes_raw or []) if loja_from_issue(i) == loja_sel] +
-                [i["key"] for i in (agendados_raw  or []) if loja_from_issue(i) == loja_sel] +
-                [i["key"] for i in (tec_raw       or []) if loja_from_issue(i) == loja_sel]
-            )
+            opts = store.keys(status=[STATUS_ID_AGENDAMENTO, STATUS_ID_AGENDADO, STATUS_ID_TEC_CAMPO], loja=loja_sel)
             sel = st.multiselect("FSAs (pend.+agend.+tec-campo):", sorted(set(opts)))
             if sel:
-                trans_opts = {t["name"]: t["id"] for t in jira.get_transitions(sel[0])}
+                trans_list = jira.get_transitions(sel[0], status=status_por_key.get(sel[0]))
+                trans_opts = {t["name"]: t["id"] for t in trans_list}
+                trans_to = {t["name"]: (t.get("to", {}) or {}).get("name") for t in trans_list}
                 choice = st.selectbox("Transição:", ["—"] + list(trans_opts))
                 extra = {}
                 if choice and "agend" in choice.lower():
@@ -370,22 +587,34 @@ with st.sidebar:
                     else:
                         prev_issue = jira.get_issue(sel[0]) or {}
                         prev = ((prev_issue.get("fields") or {}).get("status") or {}).get("name", "AGENDADO")
+                        passo = {"nome": choice, "id": trans_opts[choice], "fields": extra or None}
+                        resultado = jira.transicionar_em_massa(
+                            {k: [passo] for k in sel}, progresso=barra_progresso("Aplicando"),
+                            status_atual={k: status_por_key.get(k) for k in sel if status_por_key.get(k)},
+                        )
                         errs, mv = [], 0
-                        for k in sel:
-                            r = jira.transicionar_status(k, trans_opts[choice], fields=extra or None)
-                            if r.status_code == 204:
+                        for k, res in resultado.items():
+                            status = res["passos"][0]["status"]
+                            if status == 204:
                                 mv += 1
                             else:
-                                errs.append(f"{k}:{r.status_code}")
+                                errs.append(f"{k}:{status}")
                         if errs:
                             st.error("Falhas:")
                             [st.code(e) for e in errs]
                         else:
                             st.success(f"{mv} FSAs movidos → {choice}")
-                            st.session_state.history.append({"keys": sel, "from": prev})
+                            st.session_state.history.append({"keys": sel, "from": prev, "to": trans_to.get(choice)})
+                        sonda.esquecer()
+                        worker.trigger()
 
 # ==== Título ====
+fases.etapa("render")
 st.title("📱 Painel Field Service")
+st.caption(
+    f"Dados de {snap_dt:%H:%M:%S} (há {int(snap.age)}s, carga em {snap.duration:.1f}s)"
+    + (f" • ⚠️ última atualização falhou: {snap.error}" if snap.error else "")
+)
 
 # ==== Abas ====
 tab_details, tab_overview = st.tabs(["📋 Chamados", "📊 Visão Geral"])
@@ -405,126 +634,115 @@ with tab_details:
 
         st.session_state.filters.update({"threshold": int(threshold), "uf": uf_filter, "q": busca_loja})
 
-        destaques = []
-        for loja, data in contagem_por_loja.items():
-            if data["qtd"] >= threshold:
-                row = {
-                    "Loja": loja,
-                    "Cidade": data["cidade"],
-                    "UF": data["uf"],
-                    "Chamados": data["qtd"],
-                    "Últ. atualização": data["last_updated"].astimezone(timezone.utc).strftime("%d/%m/%Y %H:%M") if data["last_updated"] else "—",
-                    "⚠️": "🔴" if is_loja_critica(data) else "",
-                }
-                destaques.append(row)
-
-        destaques = [
-            r for r in destaques
-            if (not uf_filter or (r["UF"] or "").upper() == uf_filter.strip().upper())
-            and (not busca_loja or busca_loja.lower() in (r["Loja"] or "").lower()
-                 or busca_loja.lower() in (r["Cidade"] or "").lower())
-        ]
-
-        if order_opt == "Chamados ↓":
-            destaques.sort(key=lambda x: (-x["Chamados"], x["Loja"]))
-        elif order_opt == "Loja ↑":
-            destaques.sort(key=lambda x: (x["Loja"], -x["Chamados"]))
-        else:
-            destaques.sort(key=lambda x: ((x["Cidade"] or ""), x["Loja"]))
+        destaques = filtrar_destaques(por_loja, int(threshold), uf_filter, busca_loja, order_opt)
 
         st.caption(f"{len(destaques)} loja(s) encontradas após filtros.")
         st.dataframe(destaques, use_container_width=True, hide_index=True)
 
-        if destaques:
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=["Loja", "Cidade", "UF", "Chamados", "Últ. atualização", "⚠️"])
-            writer.writeheader()
-            writer.writerows(destaques)
+        if not destaques.empty:
             st.download_button(
                 "⬇️ Baixar CSV",
-                data=output.getvalue().encode("utf-8"),
+                data=destaques.to_csv(index=False).encode("utf-8"),
                 file_name=f"lojas_destaque_{threshold}+_{datetime.now():%Y%m%d_%H%M%S}.csv",
                 mime="text/csv"
             )
         else:
             st.info("Nenhuma loja atende aos filtros no momento.")
 
+    with st.expander("📤 Exportar backlog (AGENDAMENTO • Agendado • TEC-CAMPO)", expanded=False):
+        ce1, ce2 = st.columns([1, 2])
+        formato = ce1.selectbox("Formato", list(EXPORTADORES))
+        if ce2.toggle("Gerar arquivo", key="gerar_export"):
+            # escrito direto do snapshot para um buffer em memória (sem arquivo em disco por sessão)
+            exportar, ext, mime = EXPORTADORES[formato]
+            st.download_button(
+                f"⬇️ Baixar {formato} ({len(chamados)} chamados)",
+                data=exportar(chamados).getvalue(),
+                file_name=f"chamados_{datetime.now():%Y%m%d_%H%M%S}.{ext}",
+                mime=mime,
+            )
+
     st.markdown("")
 
     # Sub-abas: Pendentes | Agendados | TEC-CAMPO
-    t1, t2, t3 = st.tabs(["⏳ Pendentes de Agendamento", "📋 Agendados", "🧰 TEC-CAMPO"])
+    t1, t2, t3, t4 = st.tabs(["⏳ Pendentes de Agendamento", "📋 Agendados", "🧰 TEC-CAMPO",
+                              f"♊ Duplicados ({len(duplicados)})"])
 
     with t1:
         filtro_loja_pend = st.text_input("🔎 Filtrar por loja (código ou cidade) — Pendentes", "")
-        if not pendentes_raw:
+        if not pendentes:
             st.warning("Nenhum chamado em **AGENDAMENTO**.")
         else:
-            for loja, iss in sorted(jira.agrupar_chamados(pendentes_raw).items()):
-                data = contagem_por_loja.get(loja, {"qtd": len(iss), "last_updated": None})
-                alerta = " 🔴" if is_loja_critica(data) else ""
-                if filtro_loja_pend:
-                    if filtro_loja_pend.lower() not in loja.lower():
-                        cidades = {x.get("cidade", "") for x in iss}
-                        if not any(filtro_loja_pend.lower() in (c or "").lower() for c in cidades):
-                            continue
-                with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s)", expanded=False):
-                    st.code(gerar_mensagem(loja, iss), language="text")
+            baixar_mensagens(lambda: mensagens.texto_unico(agrup_pend), "pendentes")
+            lojas_vis = filtrar_lojas(sorted(agrup_pend.items()), filtro_loja_pend)
+            for loja, iss in paginar(lojas_vis, "pendentes"):
+                alerta = " 🔴" if critica_por_loja.get(loja) else ""
+                dup = keys_duplicadas(iss)
+                with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s){tag_str(dup and 'Dup: ' + ', '.join(dup))}",
+                                 expanded=False):
+                    st.code(mensagens.get(loja, iss), language="text")
 
     with t2:
         filtro_loja_ag = st.text_input("🔎 Filtrar por loja (código ou cidade) — Agendados", "")
-        if not agendados_raw:
+        if not agendados:
             st.info("Nenhum chamado em **Agendado**.")
         else:
-            for date, stores in sorted(grouped_sched.items()):
-                total = sum(len(v) for v in stores.values())
-                st.subheader(f"{date} — {total} chamado(s)")
-                for loja, iss in sorted(stores.items()):
-                    data = contagem_por_loja.get(loja, {"qtd": len(iss), "last_updated": None})
-                    alerta = " 🔴" if is_loja_critica(data) else ""
-
-                    if filtro_loja_ag and filtro_loja_ag.lower() not in loja.lower():
-                        cidades = {(x.get("fields", {}) or {}).get("customfield_11994") for x in iss}
-                        if not any(filtro_loja_ag.lower() in (c or "").lower() for c in cidades):
-                            continue
-
-                    detalhes = jira.agrupar_chamados(iss)[loja]
-                    dup_keys = [d["key"] for d in detalhes
-                                if (d["pdv"], d["ativo"]) in verificar_duplicidade(detalhes)]
-
-                    # Mantido: checagem spare por loja
-                    spare_raw, _ = jira.buscar_chamados_enhanced(
-                        f'project = FSA AND status = "Aguardando Spare" AND "Codigo da Loja[Dropdown]" = "{loja}"',
-                        FIELDS, page_size=100
-                    )
-                    spare_keys = [i["key"] for i in (spare_raw or [])]
-
-                    tags = []
-                    if spare_keys: tags.append("Spare: " + ", ".join(spare_keys))
-                    if dup_keys:   tags.append("Dup: " + ", ".join(dup_keys))
-                    tag_str = f" [{' • '.join(tags)}]" if tags else ""
-
-                    with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s){tag_str}", expanded=False):
-                        st.markdown("**FSAs:** " + ", ".join(d["key"] for d in detalhes))
-                        st.code(gerar_mensagem(loja, detalhes), language="text")
+            baixar_mensagens(lambda: "\n\n".join(f"### {date[1]}\n\n{mensagens.texto_unico(stores)}"
+                                                  for date, stores in sorted(grouped_sched.items())), "agendados")
+            # pagina sobre (data, loja) achatados; o cabeçalho da data sai quando ela aparece na página
+            lojas_vis = [
+                (date, loja, iss)
+                for date, stores in sorted(grouped_sched.items())
+                for loja, iss in filtrar_lojas(sorted(stores.items()), filtro_loja_ag)
+            ]
+            data_atual = None
+            for date, loja, iss in paginar(lojas_vis, "agendados"):
+                if date != data_atual:
+                    data_atual = date
+                    total = sum(len(v) for v in grouped_sched[date].values())
+                    st.subheader(f"{date[1]} — {total} chamado(s)")
+                alerta = " 🔴" if critica_por_loja.get(loja) else ""
+
+                detalhes = iss
+                dup_keys = keys_duplicadas(detalhes)
+                spare_keys = spare_por_loja.get(loja, [])
+                tags = tag_str(spare_keys and "Spare: " + ", ".join(spare_keys),
+                               dup_keys and "Dup: " + ", ".join(dup_keys))
+
+                with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s){tags}", expanded=False):
+                    st.markdown("**FSAs:** " + ", ".join(d["key"] for d in detalhes))
+                    st.code(mensagens.get(loja, detalhes), language="text")
 
     with t3:
         filtro_loja_tc = st.text_input("🔎 Filtrar por loja (código ou cidade) — TEC-CAMPO", "")
-        if not tec_raw:
+        if not tec_campo:
             st.info("Nenhum chamado em **TEC-CAMPO**.")
         else:
-            for loja, iss in sorted(agrup_tec.items()):
-                data = contagem_por_loja.get(loja, {"qtd": len(iss), "last_updated": None})
-                alerta = " 🔴" if is_loja_critica(data) else ""
-                if filtro_loja_tc:
-                    if filtro_loja_tc.lower() not in loja.lower():
-                        cidades = {x.get("cidade", "") for x in iss}
-                        if not any(filtro_loja_tc.lower() in (c or "").lower() for c in cidades):
-                            continue
-                with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s)", expanded=False):
-                    st.code(gerar_mensagem(loja, iss), language="text")
+            baixar_mensagens(lambda: mensagens.texto_unico(agrup_tec), "tec_campo")
+            lojas_vis = filtrar_lojas(sorted(agrup_tec.items()), filtro_loja_tc)
+            for loja, iss in paginar(lojas_vis, "tec_campo"):
+                alerta = " 🔴" if critica_por_loja.get(loja) else ""
+                dup = keys_duplicadas(iss)
+                with st.expander(f"{alerta} {loja} — {len(iss)} chamado(s){tag_str(dup and 'Dup: ' + ', '.join(dup))}",
+                                 expanded=False):
+                    st.code(mensagens.get(loja, iss), language="text")
+
+    with t4:
+        # mesmo (loja, PDV, ativo) em mais de uma FSA aberta, em qualquer status acompanhado
+        if not duplicados:
+            st.success("Nenhuma duplicidade de PDV/ativo no backlog.")
+        else:
+            st.dataframe(
+                [
+                    {"Loja": loja, "PDV": pdv or "--", "Ativo": ativo or "--", "Qtd": len(keys),
+                     "FSAs": ", ".join(f"{k} ({status_por_key.get(k, '?')})" for k in keys)}
+                    for (loja, pdv, ativo), keys in sorted(duplicados.items(), key=lambda x: (-len(x[1]), x[0]))
+                ],
+                use_container_width=True, hide_index=True,
+            )
 
     st.markdown("---")
-    st.caption(f"Última atualização: {datetime.now():%d/%m/%Y %H:%M:%S}")
+    st.caption(f"Última atualização: {snap_dt:%d/%m/%Y %H:%M:%S}")
 
 # ============================
 # 📊 Visão Geral
@@ -564,7 +782,7 @@ with tab_overview:
     colk1.metric("⏳ AGENDAMENTO", kpi["AGENDAMENTO"])
     colk2.metric("📋 Agendado",   kpi["Agendado"])
     colk3.metric("🧰 TEC-CAMPO",  kpi["TEC-CAMPO"])
-    colk4.metric("🏷️ Lojas com 2+", sum(1 for x in contagem_por_loja.values() if x["qtd"] >= 2))
+    colk4.metric("🏷️ Lojas com 2+", int((por_loja["qtd"] >= 2).sum()))
 
     st.markdown("")
     st.subheader("📌 Top 5 lojas mais críticas")
@@ -585,80 +803,104 @@ with tab_overview:
     st.markdown("")
     st.subheader("📈 Tendência (últimos dias)")
 
-    all_days = pd.date_range(
-        (datetime.now() - timedelta(days=int(st.session_state.filters["days"]))).date(),
-        datetime.now().date(),
-        freq="D"
-    )
-
-    novos = [created_from_issue(i) for i in (combo_raw or [])]
-    novos = [d for d in novos if d and (datetime.now(timezone.utc) - d) <= timedelta(days=int(st.session_state.filters["days"]))]
-    df_novos = pd.Series(1, index=[d.date() for d in novos]).groupby(level=0).sum() if novos else pd.Series(dtype=int)
-
-    resd = [resolutiondate_from_issue(i) for i in (resolvidos_raw or [])]
-    resd = [d for d in resd if d and (datetime.now(timezone.utc) - d) <= timedelta(days=int(st.session_state.filters["days"]))]
-    df_res = pd.Series(1, index=[d.date() for d in resd]).groupby(level=0).sum() if resd else pd.Series(dtype=int)
-
+    dias = int(st.session_state.filters["days"])
     chart_df = pd.DataFrame({
-        "Novos": df_novos.reindex(all_days.date, fill_value=0),
-        "Resolvidos": df_res.reindex(all_days.date, fill_value=0),
-    }, index=[d.strftime("%d/%m") for d in all_days.date])
+        "Novos": serie_diaria(df_chamados["created"], dias),
+        "Resolvidos": serie_diaria(pd.to_datetime(pd.Series([ch.resolution for ch in resolvidos]), utc=True), dias),
+    })
+    chart_df.index = [d.strftime("%d/%m") for d in chart_df.index]
 
     st.line_chart(chart_df, use_container_width=True)
 
     st.markdown("")
+    fases.etapa("geocode")
     st.subheader("🗺️ Heatmap de lojas (auto, via endereço/CEP do Jira) — gratuito (OSM)")
 
-    @st.cache_data(ttl=60*60*24, show_spinner=False)
-    def geocode_nominatim(q: str):
-        url = "https://nominatim.openstreetmap.org/search"
-        headers = {"User-Agent": "FieldServiceDashboard/1.0 (contact: ops@empresa.com)"}
-        params = {"q": q, "format": "json", "limit": 1, "countrycodes": "br"}
-        try:
-            r = requests.get(url, headers=headers, params=params, timeout=10)
-            if r.status_code == 200 and r.json():
-                item = r.json()[0]
-                return float(item["lat"]), float(item["lon"])
-        except Exception:
-            return None
-        return None
+    @st.cache_resource(show_spinner=False)
+    def get_fila_geocode(path):
+        # cache durável (endereço normalizado + CEP) + fila em background a 1 req/s (por processo)
+        return FilaGeocode(Geocoder(GeocodeStore(path)))
+
+    fila_geo = get_fila_geocode(GEOCODE_PATH)
+    geocoder = fila_geo.geocoder
 
     pontos = []
     lojas_unicas = []
-    for loja, data in contagem_por_loja.items():
-        end = (data.get("endereco") or "").strip()
-        cid = (data.get("cidade") or "").strip()
-        uf  = (data.get("uf") or "").strip()
-        cep = (data.get("cep") or "").strip()
+    for loja, end, cid, uf, cep, qtd in por_loja[["endereco", "cidade", "uf", "cep", "qtd"]].itertuples():
+        end, cid, uf, cep = end.strip(), cid.strip(), uf.strip(), cep.strip()
         if not any([end, cid, uf, cep]):
             continue
-        q = ", ".join([x for x in [end, cid, uf] if x]) + (f", {cep}" if cep else "") + ", Brasil"
-        lojas_unicas.append((loja, q, data["qtd"]))
+        lojas_unicas.append((loja, (end, cid, uf, cep), qtd))
 
     with st.expander("⚙️ Configurar geocodificação", expanded=False):
-        st.caption("Usa Nominatim (OSM) com cache de 24h.")
-        max_geocode = st.slider("Máximo de lojas para geocodificar por execução", 10, 500, min(100, len(lojas_unicas)))
-        pause = st.slider("Pausa entre chamadas (segundos)", 0.0, 2.0, 0.5, 0.1)
-        run_geo = st.checkbox("Executar geocodificação agora", value=True)
-
-    if run_geo and lojas_unicas:
-        geocoded = 0
-        for loja, query, peso in lojas_unicas[:max_geocode]:
-            coords = geocode_nominatim(query)
+        st.caption("Usa Nominatim (OSM, 1 req/s) em background, com cache local permanente por endereço + CEP.")
+        run_geo = st.checkbox("Geocodificar lojas novas em background", value=True)
+        agrupamento = st.selectbox("Agrupamento do mapa", list(MAPA_AGRUPAMENTOS), index=0)
+        st.json({**geocoder.store.info(), "na_fila": fila_geo.pendentes(), "processados": fila_geo.processados})
+
+    if lojas_unicas:
+        resolvidas = enfileiradas = 0
+        for loja, (end, cid, uf, cep), peso in lojas_unicas:
+            conhecido, coords = geocoder.em_cache(end, cid, uf, cep)
+            if not conhecido:
+                if run_geo:
+                    enfileiradas += fila_geo.enfileirar(end, cid, uf, cep)
+                continue
+            resolvidas += 1
             if coords:
                 lat, lon = coords
-                pontos += [{"lat": lat, "lon": lon} for _ in range(max(1, int(peso)))]
-            geocoded += 1
-            if pause > 0:
-                time.sleep(pause)
-
-        if pontos:
-            st.map(pd.DataFrame(pontos), use_container_width=True)
+                pontos.append((lat, lon, max(1, int(peso))))
+
+        celula, zoom = MAPA_AGRUPAMENTOS[agrupamento]
+        camada = agregar_pontos(pontos, celula)
+        if camada:
+            df_mapa = pd.DataFrame(camada)
+            st.pydeck_chart(pdk.Deck(
+                layers=[
+                    pdk.Layer("HeatmapLayer", df_mapa, get_position="[lon, lat]", get_weight="peso",
+                              radius_pixels=40, aggregation="SUM"),
+                    # camada invisível só para o tooltip (o HeatmapLayer não é "pickable")
+                    pdk.Layer("ScatterplotLayer", df_mapa, get_position="[lon, lat]", get_radius=2000,
+                              radius_min_pixels=6, get_fill_color=[0, 0, 0, 0], pickable=True),
+                ],
+                initial_view_state=pdk.ViewState(
+                    latitude=float(df_mapa["lat"].mean()), longitude=float(df_mapa["lon"].mean()), zoom=zoom
+                ),
+                tooltip={"text": "{lojas} loja(s) • {peso} chamado(s)"},
+            ), use_container_width=True)
         else:
-            st.info("Nenhuma loja geocodificada com sucesso nesta execução.")
-        st.caption(f"Geocodificadas: {geocoded} / {len(lojas_unicas)} loja(s)")
+            st.info("Nenhuma loja com coordenadas ainda — o mapa é preenchido conforme a fila avança.")
+        st.caption(
+            f"Resolvidas: {resolvidas} / {len(lojas_unicas)} loja(s) • pontos no mapa: {len(camada)} • "
+            f"na fila: {fila_geo.pendentes()} (novas nesta execução: {enfileiradas})"
+        )
     else:
-        st.info("Ative “Executar geocodificação agora” para gerar o mapa.")
+        st.info("Nenhuma loja com endereço/CEP para o mapa.")
 
     st.markdown("---")
-    st.caption(f"Última atualização: {datetime.now():%d/%m/%Y %H:%M:%S}")
+    st.caption(f"Última atualização: {snap_dt:%d/%m/%Y %H:%M:%S}")
+
+# ==== Profiling (fases desta execução + latência das chamadas ao Jira) ====
+fases.fim()
+with st.sidebar:
+    with st.expander("⏱️ Profiling", expanded=False):
+        st.caption("Fases desta execução do script (ms)")
+        st.json(fases.resultado())
+        st.caption("Última carga do worker (ms)")
+        st.json(snap.data.get("tempos") or {})
+        st.caption("Jira por endpoint (janela móvel)")
+        resumo_jira = jira.telemetria.resumo()
+        st.dataframe(
+            [{k: v for k, v in r.items() if k != "hist"} for r in resumo_jira],
+            use_container_width=True, hide_index=True,
+        )
+        for r in resumo_jira:
+            st.bar_chart(pd.Series(r["hist"], name=f'{r["method"]} {r["endpoint"]}'), height=120)
+        st.caption("Buscas paginadas recentes")
+        st.dataframe(jira.telemetria.buscas(20)[::-1], use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Exportar profiling (JSON)",
+            data=json.dumps({"fases": fases.resultado(), "worker": snap.data.get("tempos") or {},
+                             **jira.telemetria.exportar()}, ensure_ascii=False, indent=2, default=str),
+            file_name=f"profiling_{datetime.now():%Y%m%d_%H%M%S}.json", mime="application/json",
+        )
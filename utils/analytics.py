@@ -0,0 +1,100 @@
+# utils/analytics.py
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .records import Chamado
+
+# loja crítica: muitos chamados abertos ou sem atualização há muito tempo
+CRITICA_MIN_CHAMADOS = 5
+CRITICA_DIAS_SEM_UPDATE = 7
+
+_COLUNAS = ("key", "status", "status_id", "loja", "cidade", "estado", "cep", "endereco",
+            "created", "updated", "resolution")
+_DT_COLS = ("created", "updated", "resolution")
+_TEXTO_LOJA = ("cidade", "estado", "endereco", "cep")
+
+
+def para_dataframe(chamados: Iterable[Chamado]) -> pd.DataFrame:
+    """
+    Tabela colunar dos registros (uma linha por FSA), na ordem recebida. Textos vazios
+    viram NA (para `first()` pular) e datas viram datetime64 em UTC.
+    """
+    chamados = list(chamados)
+    df = pd.DataFrame({c: [getattr(ch, c) for ch in chamados] for c in _COLUNAS})
+    for c in _DT_COLS:
+        df[c] = pd.to_datetime(df[c], utc=True)
+    for c in _TEXTO_LOJA:
+        df[c] = df[c].replace("", pd.NA)
+    return df
+
+
+def resumo_por_loja(df: pd.DataFrame, agora: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Um groupby por loja: qtd, último `updated`, primeiro texto não vazio de
+    cidade/UF/endereço/CEP (na ordem do df) e a flag `critica`. Índice = loja.
+    """
+    agora = pd.Timestamp(agora or datetime.now(timezone.utc))
+    g = df.groupby("loja", sort=False)
+    out = g[list(_TEXTO_LOJA)].first().rename(columns={"estado": "uf"})
+    out["qtd"] = g.size()
+    out["last_updated"] = g["updated"].max()
+    out["critica"] = (out["qtd"] >= CRITICA_MIN_CHAMADOS) | (
+        (agora - out["last_updated"]) > pd.Timedelta(days=CRITICA_DIAS_SEM_UPDATE)
+    )
+    # sem chamados o groupby devolve colunas/índice float64, e `.str` nos filtros quebraria
+    textos = ["cidade", "uf", "endereco", "cep"]
+    out[textos] = out[textos].astype(object).fillna("")
+    out.index = out.index.astype(object)
+    return out
+
+
+def top_lojas(por_loja: pd.DataFrame, n: int = 5) -> List[Dict[str, Any]]:
+    """As `n` lojas com mais chamados (desempate pelo nome)."""
+    top = por_loja.reset_index().sort_values(["qtd", "loja"], ascending=[False, True]).head(n)
+    return [
+        {**row, "last_updated": None if pd.isna(row["last_updated"]) else row["last_updated"].to_pydatetime()}
+        for row in top[["loja", "cidade", "uf", "qtd", "last_updated", "critica"]].to_dict("records")
+    ]
+
+
+def filtrar_destaques(
+    por_loja: pd.DataFrame,
+    threshold: int,
+    uf: str = "",
+    busca: str = "",
+    ordem: str = "Chamados ↓",
+) -> pd.DataFrame:
+    """Tabela de destaques (lojas com `threshold`+ chamados), filtrada e ordenada, pronta para exibir/exportar."""
+    sel = por_loja[por_loja["qtd"] >= threshold].reset_index()
+    if uf:
+        sel = sel[sel["uf"].str.upper() == uf.strip().upper()]
+    if busca:
+        b = busca.lower()
+        sel = sel[sel["loja"].str.lower().str.contains(b, regex=False)
+                  | sel["cidade"].str.lower().str.contains(b, regex=False)]
+    if ordem == "Chamados ↓":
+        sel = sel.sort_values(["qtd", "loja"], ascending=[False, True])
+    elif ordem == "Loja ↑":
+        sel = sel.sort_values(["loja", "qtd"], ascending=[True, False])
+    else:
+        sel = sel.sort_values(["cidade", "loja"])
+    return pd.DataFrame({
+        "Loja": sel["loja"],
+        "Cidade": sel["cidade"],
+        "UF": sel["uf"],
+        "Chamados": sel["qtd"],
+        "Últ. atualização": sel["last_updated"].dt.strftime("%d/%m/%Y %H:%M").fillna("—"),
+        "⚠️": sel["critica"].map({True: "🔴", False: ""}),
+    })
+
+
+def serie_diaria(datas: pd.Series, dias: int, agora: Optional[datetime] = None) -> pd.Series:
+    """Contagem por dia (UTC) das datas dos últimos `dias` dias, com zeros nos dias sem eventos."""
+    agora = agora or datetime.now(timezone.utc)
+    datas = datas.dropna()
+    datas = datas[(pd.Timestamp(agora) - datas) <= pd.Timedelta(days=dias)]
+    contagem = datas.dt.date.value_counts()
+    dias_idx = pd.date_range((agora - timedelta(days=dias)).date(), agora.date(), freq="D").date
+    return contagem.reindex(dias_idx, fill_value=0)
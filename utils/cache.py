@@ -0,0 +1,49 @@
+# utils/cache.py
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SharedCache:
+    """
+    Memo em memória do processo com TTL (hoje só o whoami, chamado pelo worker a cada carga).
+    `aceitar(valor)` decide se um resultado pode ser guardado (ex.: só autenticação ok).
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self.stats = {"hit": 0, "miss": 0}
+
+    def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        aceitar: Optional[Callable[[Any], bool]] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Retorna (valor, meta) com meta = {"cache": hit|miss, "age": segundos}."""
+        ttl = self.ttl if ttl is None else float(ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] < ttl:
+                self.stats["hit"] += 1
+                return entry[0], {"cache": "hit", "age": round(time.time() - entry[1], 1)}
+            self.stats["miss"] += 1
+        value = loader()
+        if aceitar is None or aceitar(value):
+            with self._lock:
+                self._entries[key] = (value, time.time())
+        return value, {"cache": "miss", "age": 0.0}
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), **self.stats}
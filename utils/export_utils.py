@@ -1,27 +1,113 @@
-import pandas as pd
+import csv
+import io
+from datetime import datetime
+
+import xlsxwriter
 from fpdf import FPDF
 
-def chamados_to_csv(chamados, filename="chamados_exportados.csv"):
-    df = pd.DataFrame(chamados)
-    df.to_csv(filename, index=False)
-    return filename
+# (atributo do Chamado, cabeçalho) — mesma ordem em CSV, XLSX e PDF
+COLUNAS = [
+    ("key", "Chamado"),
+    ("status", "Status"),
+    ("loja", "Loja"),
+    ("pdv", "PDV"),
+    ("ativo", "Ativo"),
+    ("problema", "Problema"),
+    ("data_agendada", "Data Agendada"),
+    ("endereco", "Endereço"),
+    ("cidade", "Cidade"),
+    ("estado", "UF"),
+    ("cep", "CEP"),
+    ("updated", "Atualizado"),
+]
 
-def chamados_to_pdf(chamados, filename="chamados_exportados.pdf"):
+
+def _texto(val, vazio=""):
+    if val is None or val == "":
+        return vazio
+    if isinstance(val, datetime):
+        return val.strftime("%d/%m/%Y %H:%M")
+    return str(val)
+
+
+def _linha(ch, vazio=""):
+    """Uma linha de valores (texto) a partir de um Chamado ou de um dict com as mesmas chaves."""
+    return [_texto(ch.get(attr), vazio) for attr, _ in COLUNAS]
+
+
+def chamados_csv_buffer(chamados) -> io.BytesIO:
+    """
+    CSV (UTF-8 com BOM, para abrir direto no Excel) escrito linha a linha a partir do iterador,
+    sem DataFrame intermediário. Devolve o buffer posicionado no início (pronto para st.download_button).
+    """
+    buf = io.BytesIO()
+    txt = io.TextIOWrapper(buf, encoding="utf-8-sig", newline="")
+    w = csv.writer(txt)
+    w.writerow([h for _, h in COLUNAS])
+    for ch in chamados:
+        w.writerow(_linha(ch))
+    txt.flush()
+    txt.detach()
+    buf.seek(0)
+    return buf
+
+
+def chamados_xlsx_buffer(chamados, sheet="Chamados") -> io.BytesIO:
+    """
+    XLSX via xlsxwriter em modo constant_memory: cada linha vai para o arquivo temporário da
+    planilha assim que é escrita, então a memória não cresce com o nº de chamados.
+    """
+    buf = io.BytesIO()
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True, "in_memory": False})
+    ws = wb.add_worksheet(sheet)
+    bold = wb.add_format({"bold": True})
+    ws.write_row(0, 0, [h for _, h in COLUNAS], bold)
+    row = 0
+    for row, ch in enumerate(chamados, start=1):
+        ws.write_row(row, 0, _linha(ch))
+    ws.autofilter(0, 0, row, len(COLUNAS) - 1)
+    ws.freeze_panes(1, 0)
+    wb.close()
+    buf.seek(0)
+    return buf
+
+
+def chamados_pdf_buffer(chamados, titulo="Chamados") -> io.BytesIO:
+    """
+    PDF com um bloco por chamado, gerado em memória. O FPDF monta o documento inteiro antes
+    de serializar, então aqui só se evita o arquivo fixo em disco e listas intermediárias.
+    """
     pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=12)
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 8, titulo, ln=1)
+    pdf.set_font("Arial", size=9)
 
     for ch in chamados:
-        pdf.multi_cell(0, 10,
-            f"Chamado: {ch['key']}\n"
-            f"Loja: {ch.get('loja','--')}\n"
-            f"PDV: {ch.get('pdv','--')}\n"
-            f"Ativo: {ch.get('ativo','--')}\n"
-            f"Problema: {ch.get('problema','--')}\n"
-            f"Data Agendada: {ch.get('data_agendada','--')}\n"
-            f"Endereço: {ch.get('endereco','--')}\n"
-            f"Cidade: {ch.get('cidade','--')} - {ch.get('estado','--')} (CEP: {ch.get('cep','--')})\n"
-            "--------------------------------------------"
+        v = dict(zip((attr for attr, _ in COLUNAS), _linha(ch, "--")))
+        texto = (
+            f"Chamado: {v['key']}  ({v['status']})\n"
+            f"Loja: {v['loja']}  |  PDV: {v['pdv']}  |  Ativo: {v['ativo']}\n"
+            f"Problema: {v['problema']}\n"
+            f"Data Agendada: {v['data_agendada']}\n"
+            f"Endereço: {v['endereco']}\n"
+            f"Cidade: {v['cidade']} - {v['estado']} (CEP: {v['cep']})"
         )
-    pdf.output(filename)
+        # FPDF 1.x só fala latin-1 com as fontes padrão
+        pdf.multi_cell(0, 5, texto.encode("latin-1", "replace").decode("latin-1"))
+        pdf.ln(3)
+
+    return io.BytesIO(pdf.output(dest="S").encode("latin-1"))
+
+
+def chamados_to_csv(chamados, filename="chamados_exportados.csv"):
+    with open(filename, "wb") as f:
+        f.write(chamados_csv_buffer(chamados).getbuffer())
+    return filename
+
+
+def chamados_to_pdf(chamados, filename="chamados_exportados.pdf"):
+    with open(filename, "wb") as f:
+        f.write(chamados_pdf_buffer(chamados).getbuffer())
     return filename
@@ -0,0 +1,264 @@
+# utils/geocode.py
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "FieldServiceDashboard/1.0 (contact: ops@empresa.com)"
+
+# abreviações comuns em endereços do Jira → forma canônica (após remover acentos/pontuação)
+_ABREV = {
+    "r": "rua", "av": "avenida", "avda": "avenida", "al": "alameda", "trav": "travessa",
+    "tv": "travessa", "rod": "rodovia", "estr": "estrada", "pca": "praca", "pc": "praca",
+    "lgo": "largo", "n": "", "no": "", "num": "", "s/n": "sn",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    addr_key TEXT PRIMARY KEY, cep TEXT, lat REAL, lon REAL, ts REAL
+);
+CREATE INDEX IF NOT EXISTS ix_geocode_cep ON geocode(cep);
+CREATE TABLE IF NOT EXISTS cep_centroid (
+    cep TEXT PRIMARY KEY, lat REAL, lon REAL, ts REAL
+);
+"""
+
+Coords = Tuple[float, float]
+
+
+def normalizar_cep(cep: Any) -> str:
+    digits = re.sub(r"\D", "", str(cep or ""))
+    return digits if len(digits) == 8 else ""
+
+
+def normalizar_endereco(*partes: Any) -> str:
+    """Minúsculas, sem acentos/pontuação, abreviações expandidas e espaços colapsados."""
+    txt = " ".join(str(p) for p in partes if p)
+    txt = unicodedata.normalize("NFKD", txt).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = re.sub(r"[^\w/]+", " ", txt).split()
+    return " ".join(t for t in (_ABREV.get(t, t) for t in tokens) if t)
+
+
+def chave_geocode(endereco: str, cidade: str, uf: str, cep: str) -> str:
+    return f"{normalizar_endereco(endereco, cidade, uf)}|{normalizar_cep(cep)}"
+
+
+class GeocodeStore:
+    """
+    Cache durável (SQLite) de geocodificação, por endereço normalizado + CEP.
+    Acertos não expiram; falhas ficam gravadas com lat/lon NULL (cache negativo) e só
+    são tentadas de novo depois de `negative_ttl` segundos. Guarda também centróides por CEP.
+    """
+
+    def __init__(self, path: str, negative_ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.negative_ttl = float(negative_ttl)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _get(self, table: str, col: str, key: str) -> Tuple[bool, Optional[Coords]]:
+        """(conhecido, coords): conhecido=False se ausente ou falha expirada."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT lat, lon, ts FROM {table} WHERE {col} = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        lat, lon, ts = row
+        if lat is None:
+            return (time.time() - (ts or 0)) < self.negative_ttl, None
+        return True, (lat, lon)
+
+    def get(self, addr_key: str) -> Tuple[bool, Optional[Coords]]:
+        return self._get("geocode", "addr_key", addr_key)
+
+    def put(self, addr_key: str, cep: str, coords: Optional[Coords]):
+        lat, lon = coords if coords else (None, None)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO geocode (addr_key, cep, lat, lon, ts) VALUES (?, ?, ?, ?, ?)",
+                               (addr_key, cep, lat, lon, time.time()))
+
+    def get_cep(self, cep: str) -> Tuple[bool, Optional[Coords]]:
+        return self._get("cep_centroid", "cep", cep)
+
+    def put_cep(self, cep: str, coords: Optional[Coords]):
+        lat, lon = coords if coords else (None, None)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cep_centroid (cep, lat, lon, ts) VALUES (?, ?, ?, ?)",
+                               (cep, lat, lon, time.time()))
+
+    def media_cep(self, cep: str) -> Optional[Coords]:
+        """Centróide local: média dos endereços já geocodificados com o mesmo CEP."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT AVG(lat), AVG(lon) FROM geocode WHERE cep = ? AND lat IS NOT NULL", (cep,)
+            ).fetchone()
+        return (row[0], row[1]) if row and row[0] is not None else None
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self._conn.execute(
+                "SELECT COUNT(lat), COUNT(*) - COUNT(lat) FROM geocode"
+            ).fetchone()
+            ceps = self._conn.execute("SELECT COUNT(*) FROM cep_centroid").fetchone()[0]
+        return {"path": self.path, "enderecos": hits, "falhas": misses, "ceps": ceps}
+
+
+class Geocoder:
+    """
+    Geocodificação via Nominatim (OSM) com cache durável:
+      1) endereço normalizado + CEP no GeocodeStore (sem rede);
+      2) Nominatim texto livre;
+      3) fallback por CEP: média local dos endereços do mesmo CEP → centróide em cache →
+         Nominatim estruturado (postalcode).
+    Respeita a política do Nominatim (no máximo 1 requisição/segundo, por processo).
+    """
+
+    def __init__(self, store: GeocodeStore, min_interval: float = 1.0, user_agent: str = USER_AGENT):
+        self.store = store
+        self.min_interval = float(min_interval)
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": user_agent})
+        self._net_lock = threading.Lock()
+        self._last_call = 0.0
+        self.network_calls = 0
+
+    def _nominatim(self, params: Dict[str, Any]) -> Optional[Coords]:
+        with self._net_lock:
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                r = self._session.get(NOMINATIM_URL, params={**params, "format": "json", "limit": 1,
+                                                             "countrycodes": "br"}, timeout=10)
+                self.network_calls += 1
+            finally:
+                self._last_call = time.monotonic()
+        # erro de rede/HTTP sobe (não vira cache negativo); lista vazia = endereço não encontrado
+        r.raise_for_status()
+        data = r.json()
+        if data:
+            return float(data[0]["lat"]), float(data[0]["lon"])
+        return None
+
+    def em_cache(self, endereco: str, cidade: str, uf: str, cep: str) -> Tuple[bool, Optional[Coords]]:
+        """Só consulta o cache local (sem rede): (resolvido, coords)."""
+        return self.resolver(endereco, cidade, uf, cep, online=False)
+
+    def resolver(self, endereco: str, cidade: str, uf: str, cep: str, online: bool = True) -> Tuple[bool, Optional[Coords]]:
+        """
+        Retorna (resolvido, coords). resolvido=False significa que faltaria ir à rede
+        (só acontece com online=False); coords=None com resolvido=True é falha conhecida.
+        Erros de rede/HTTP do Nominatim propagam (requests.RequestException) e nada é gravado.
+        """
+        cep_n = normalizar_cep(cep)
+        key = chave_geocode(endereco, cidade, uf, cep)
+        if key == "|":
+            return True, None
+
+        known, coords = self.store.get(key)
+        if not known:
+            if not online:
+                return False, None
+            q = ", ".join(x for x in [endereco, cidade, uf] if x) + (f", {cep}" if cep else "") + ", Brasil"
+            coords = self._nominatim({"q": q})
+            self.store.put(key, cep_n, coords)
+        if coords or not cep_n:
+            return True, coords
+
+        # fallback por CEP
+        coords = self.store.media_cep(cep_n)
+        if coords:
+            return True, coords
+        known, coords = self.store.get_cep(cep_n)
+        if not known:
+            if not online:
+                return False, None
+            coords = self._nominatim({"postalcode": f"{cep_n[:5]}-{cep_n[5:]}", "country": "Brasil"})
+            self.store.put_cep(cep_n, coords)
+        return True, coords
+
+
+def agregar_pontos(pontos: Iterable[Tuple[float, float, float]], celula_graus: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Agrega (lat, lon, peso) em uma linha por local: sem `celula_graus`, uma por coordenada
+    distinta (loja); com `celula_graus`, uma por célula de grade, no centróide ponderado.
+    O tamanho da saída cresce com o nº de locais, não com o nº de chamados.
+    """
+    cells: Dict[Tuple[float, float], List[float]] = {}
+    for lat, lon, peso in pontos:
+        if celula_graus:
+            key = (lat // celula_graus, lon // celula_graus)
+        else:
+            key = (lat, lon)
+        acc = cells.get(key)
+        if acc is None:
+            acc = cells[key] = [0.0, 0.0, 0.0, 0]
+        acc[0] += lat * peso
+        acc[1] += lon * peso
+        acc[2] += peso
+        acc[3] += 1
+    return [
+        {"lat": slat / w, "lon": slon / w, "peso": w, "lojas": n}
+        for slat, slon, w, n in cells.values() if w > 0
+    ]
+
+
+class FilaGeocode:
+    """
+    Fila de geocodificação em background: uma thread consome os endereços ainda não
+    resolvidos (Geocoder.resolver, que já respeita 1 req/s) e grava no GeocodeStore.
+    A UI só lê o cache (Geocoder.em_cache) e enfileira o que faltar; o mapa vai
+    completando nos refreshes seguintes, sem bloquear a renderização.
+    """
+
+    def __init__(self, geocoder: Geocoder, max_pendentes: int = 1000):
+        self.geocoder = geocoder
+        self.max_pendentes = int(max_pendentes)
+        self._fila: "queue.Queue[Tuple[str, Tuple[str, str, str, str]]]" = queue.Queue()
+        self._pendentes: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.processados = 0
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, endereco: str, cidade: str, uf: str, cep: str) -> bool:
+        """Enfileira um endereço (uma vez só enquanto pendente). Retorna True se entrou na fila."""
+        key = chave_geocode(endereco, cidade, uf, cep)
+        with self._lock:
+            if key in self._pendentes or len(self._pendentes) >= self.max_pendentes:
+                return False
+            self._pendentes.add(key)
+            self._start()
+        self._fila.put((key, (endereco, cidade, uf, cep)))
+        return True
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._pendentes)
+
+    def _run(self):
+        while True:
+            key, partes = self._fila.get()
+            try:
+                self.geocoder.resolver(*partes)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._pendentes.discard(key)
+                    self.processados += 1
+                self._fila.task_done()
@@ -1,10 +1,19 @@
 # utils/jira_api.py
 import base64
 import json
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from collections import defaultdict
-from typing import Tuple, Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple, Dict, Any, Optional, List, Callable, Union, Iterator
+
+from .ratelimit import RateLimiter, THROTTLE_STATUS
+from .records import Chamado, normalizar
+from .sync import strip_order_by
+from .telemetry import Telemetria
 
 
 class JiraAPI:
@@ -18,6 +27,14 @@ class JiraAPI:
       - POST /rest/api/3/jql/parse
       - POST /rest/api/3/search/approximate-count
       - POST /rest/api/3/search/jql (enhanced search, com paginação via nextPageToken)
+
+    As chamadas HTTP passam por um pool de conexões keep-alive compartilhado
+    (um HTTPAdapter único montado em uma Session por thread), com timeouts
+    de conexão/leitura por chamada. Mantenha a instância viva entre reruns
+    (ex.: st.cache_resource) para reaproveitar as conexões TLS.
+
+    Toda requisição passa pelo RateLimiter (token bucket + Retry-After + concorrência
+    adaptativa); a busca paginada retoma do último nextPageToken se for limitada no meio.
     """
 
     def __init__(
@@ -26,17 +43,46 @@ class JiraAPI:
         api_token: str,
         jira_url: str,
         use_ex_api: bool = False,
-        cloud_id: Optional[str] = None
+        cloud_id: Optional[str] = None,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        limiter: Optional[RateLimiter] = None,
+        telemetria: Optional[Telemetria] = None,
     ):
         self.email = email.strip()
         self.api_token = api_token.strip()
         self.jira_url = jira_url.rstrip("/")
         self.use_ex_api = use_ex_api
         self.cloud_id = cloud_id
+        self.timeout = (float(connect_timeout), float(read_timeout))
 
         self.auth = HTTPBasicAuth(self.email, self.api_token)
         self.hdr_json = {"Accept": "application/json", "Content-Type": "application/json"}
         self.hdr_accept = {"Accept": "application/json"}
+        if self.use_ex_api:
+            # header Basic montado uma única vez (EX API não aceita auth= do requests)
+            basic = f"{self.email}:{self.api_token}".encode("utf-8")
+            authorization = "Basic " + base64.b64encode(basic).decode("ascii")
+            self.hdr_json = {**self.hdr_json, "Authorization": authorization}
+            self.hdr_accept = {**self.hdr_accept, "Authorization": authorization}
+
+        # pool keep-alive: o adapter (e seu PoolManager) é thread-safe e compartilhado;
+        # cada thread recebe sua própria Session (cookies isolados) montada nele.
+        self.pool_size = int(pool_size)
+        self._adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self._local = threading.local()
+
+        # agendador de requisições (429/503, Retry-After, concorrência adaptativa)
+        self.limiter = limiter or RateLimiter(max_concurrency=self.pool_size)
+
+        # latência por chamada (método, endpoint, status, bytes, duração) e por busca paginada
+        self.telemetria = telemetria or Telemetria()
+
+        # catálogo de transições por (projeto, status): no workflow da FSA as transições
+        # disponíveis dependem só do status atual da issue
+        self._transicoes: Dict[Tuple[str, str], List[dict]] = {}
+        self._transicoes_lock = threading.Lock()
 
         # debug da última chamada
         self.last_status = None
@@ -55,17 +101,35 @@ class JiraAPI:
         return f"{self.jira_url}/rest/api/3"
 
     def _auth_headers(self, json_content: bool = False) -> Dict[str, str]:
-        """Na EX API a autenticação é via header Basic manual."""
-        if not self.use_ex_api:
-            return self.hdr_json if json_content else self.hdr_accept
-        basic = f"{self.email}:{self.api_token}".encode("utf-8")
-        base = {
-            "Authorization": "Basic " + base64.b64encode(basic).decode("ascii"),
-            "Accept": "application/json",
-        }
-        if json_content:
-            base["Content-Type"] = "application/json"
-        return base
+        """Na EX API a autenticação é via header Basic manual (pré-calculado no __init__)."""
+        return self.hdr_json if json_content else self.hdr_accept
+
+    # ---------- sessão / pool ----------
+    def _session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            sess.mount("https://", self._adapter)
+            sess.mount("http://", self._adapter)
+            if not self.use_ex_api:
+                sess.auth = self.auth
+            self._local.session = sess
+        return sess
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Conexões abertas x requisições feitas no pool (reused = requisições sem novo handshake)."""
+        pools = self._adapter.poolmanager.pools
+        conns = reqs = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            conns += pool.num_connections
+            reqs += pool.num_requests
+        return {"pools": len(pools), "connections": conns, "requests": reqs, "reused": max(0, reqs - conns)}
+
+    def close(self):
+        self._adapter.close()
 
     def _set_debug(self, url: str, params: Any, status: int, error: Any, count: int, method: str):
         self.last_url = url
@@ -75,16 +139,29 @@ class JiraAPI:
         self.last_count = count
         self.last_method = method
 
-    def _req(self, method: str, url: str, *, json_body: Any = None, params: Dict[str, Any] = None, json_content=True):
-        if self.use_ex_api:
-            return requests.request(method, url, headers=self._auth_headers(json_content=json_content),
-                                    data=(json.dumps(json_body) if json_body is not None else None),
-                                    params=params)
-        else:
-            return requests.request(method, url, headers=(self.hdr_json if json_content else self.hdr_accept),
-                                    auth=self.auth,
-                                    json=(json_body if json_body is not None else None),
-                                    params=params)
+    def _req(self, method: str, url: str, *, json_body: Any = None, params: Dict[str, Any] = None, json_content=True,
+             timeout: Any = None):
+        sess = self._session()
+        data = json.dumps(json_body) if json_body is not None else None
+
+        def send():
+            # cada tentativa (inclusive 429 repetidos pelo limiter) vira uma amostra de latência
+            t0 = time.perf_counter()
+            try:
+                r = sess.request(
+                    method, url,
+                    headers=self._auth_headers(json_content=json_content),
+                    data=data,
+                    params=params,
+                    timeout=(timeout if timeout is not None else self.timeout),
+                )
+            except requests.RequestException:
+                self.telemetria.registrar(method, url, -1, 0, time.perf_counter() - t0)
+                raise
+            self.telemetria.registrar(method, url, r.status_code, len(r.content or b""), time.perf_counter() - t0)
+            return r
+
+        return self.limiter.executar(send)
 
     # ---------- diagnóstico ----------
     def whoami(self) -> Tuple[Dict[str, Any] | None, Dict[str, Any]]:
@@ -127,23 +204,58 @@ class JiraAPI:
         except requests.RequestException as e:
             return {"url": url, "status": -1, "error": str(e)}
 
+    def impressao_digital(self, jql: str) -> Dict[str, Any]:
+        """
+        Sonda barata de mudança de um JQL: approximate-count + a issue de `updated` mais recente
+        (1 resultado, só o campo updated). Se count, key e updated do topo não mudaram, o
+        resultado do JQL também não mudou (entradas mudam o count; edições/transições, o updated).
+        Retorna {"status", "count", "top_key", "max_updated"} — status != 200 se alguma parte falhar.
+        """
+        base = strip_order_by(jql)
+        cnt = self.count_jql(base)
+        if cnt.get("status") != 200:
+            return {"status": cnt.get("status"), "error": cnt.get("error")}
+        url = f"{self._base()}/search/jql"
+        body = {"jql": f"{base} ORDER BY updated DESC", "maxResults": 1, "fields": ["updated"]}
+        try:
+            r = self._req("POST", url, json_body=body)
+            if r.status_code != 200:
+                return {"status": r.status_code, "error": _safe_json(r)}
+            top = (r.json().get("issues") or [{}])[0]
+        except requests.RequestException as e:
+            return {"status": -1, "error": str(e)}
+        return {"status": 200, "count": cnt.get("count", 0), "top_key": top.get("key"),
+                "max_updated": (top.get("fields") or {}).get("updated")}
+
     # ---------- busca principal (ENHANCED) ----------
-    def buscar_chamados_enhanced(self, jql: str, fields: str | List[str], page_size: int = 100, reconcile: bool = False) -> Tuple[List[dict], Dict[str, Any]]:
+    def iter_paginas(
+        self,
+        jql: str,
+        fields: str | List[str],
+        page_size: int = 100,
+        reconcile: bool = False,
+        dbg: Optional[Dict[str, Any]] = None,
+        next_page_token: Optional[str] = None,
+    ) -> Iterator[List[dict]]:
         """
-        POST /search/jql com body JSON (jql, fields, maxResults) + paginação via nextPageToken.
-        Retorna (issues, debug_dict)
+        Gera as páginas de POST /search/jql conforme chegam (paginação via nextPageToken),
+        sem acumular o JSON das páginas anteriores.
+        Ao terminar (ou falhar), preenche `dbg` com o mesmo debug_dict de buscar_chamados_enhanced;
+        em caso de erro a iteração simplesmente para — confira `dbg["status"]`; `dbg["next_page_token"]`
+        indica a página que falhou, para retomar a partir dela (`next_page_token=`).
         """
-        base = self._base()
-        url = f"{base}/search/jql"
+        dbg = {} if dbg is None else dbg
+        url = f"{self._base()}/search/jql"
 
         if isinstance(fields, str):
             fields_list = [f.strip() for f in fields.split(",") if f.strip()]
         else:
             fields_list = list(fields or [])
 
-        issues: List[dict] = []
-        next_page_token: Optional[str] = None
-        last_resp = {}
+        total = 0
+        pages = 0
+        last_params = None
+        t0 = time.perf_counter()
 
         while True:
             body = {
@@ -161,52 +273,193 @@ class JiraAPI:
                 if r.status_code != 200:
                     err = _safe_json(r)
                     self._set_debug(url, {"method": "POST", **body}, r.status_code, err, 0, "POST")
-                    return [], {"url": url, "params": body, "status": r.status_code, "error": err, "count": 0, "method": "POST"}
-
+                    dbg.update({"url": url, "params": body, "status": r.status_code, "error": err, "count": total,
+                                "pages": pages, "method": "POST", "next_page_token": next_page_token})
+                    self.telemetria.registrar_busca(url, r.status_code, pages, total, time.perf_counter() - t0)
+                    return
                 data = r.json()
-                batch = data.get("issues", [])
-                issues.extend(batch)
-                next_page_token = data.get("nextPageToken")
-                last_resp = {"url": url, "params": body, "status": 200, "count": len(batch), "method": "POST"}
-
-                if not next_page_token:
-                    break
             except requests.RequestException as e:
                 self._set_debug(url, {"method": "POST", **body}, -1, str(e), 0, "POST")
-                return [], {"url": url, "params": body, "status": -1, "error": str(e), "count": 0, "method": "POST"}
+                dbg.update({"url": url, "params": body, "status": -1, "error": str(e), "count": total,
+                            "pages": pages, "method": "POST", "next_page_token": next_page_token})
+                self.telemetria.registrar_busca(url, -1, pages, total, time.perf_counter() - t0)
+                return
+
+            batch = data.get("issues", [])
+            next_page_token = data.get("nextPageToken")
+            last_params = body
+            total += len(batch)
+            pages += 1
+            del data
+            yield batch
+
+            if not next_page_token:
+                break
 
-        self._set_debug(url, last_resp.get("params"), last_resp.get("status", 200), None, len(issues), "POST")
-        return issues, {"url": url, "status": 200, "count": len(issues), "method": "POST"}
+        self._set_debug(url, last_params, 200, None, total, "POST")
+        dbg.update({"url": url, "status": 200, "count": total, "pages": pages, "method": "POST"})
+        self.telemetria.registrar_busca(url, 200, pages, total, time.perf_counter() - t0)
+
+    def iter_chamados(
+        self,
+        jql: str,
+        fields: str | List[str],
+        page_size: int = 100,
+        reconcile: bool = False,
+        projetar: Optional[Callable[[dict], Any]] = None,
+        dbg: Optional[Dict[str, Any]] = None,
+        next_page_token: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """
+        Gera issue a issue (ou `projetar(issue)`, se informado) conforme as páginas chegam.
+        Útil para reduzir backlogs grandes a registros compactos sem guardar o JSON bruto.
+        """
+        for page in self.iter_paginas(jql, fields, page_size=page_size, reconcile=reconcile, dbg=dbg,
+                                      next_page_token=next_page_token):
+            if projetar is None:
+                yield from page
+            else:
+                for issue in page:
+                    yield projetar(issue)
+
+    def buscar_chamados_enhanced(
+        self,
+        jql: str,
+        fields: str | List[str],
+        page_size: int = 100,
+        reconcile: bool = False,
+        projetar: Optional[Callable[[dict], Any]] = None,
+        retomadas: int = 3,
+    ) -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        POST /search/jql com body JSON (jql, fields, maxResults) + paginação via nextPageToken.
+        Retorna (issues, debug_dict).
+        Se uma página falhar por limite (429/503) ou rede depois das tentativas do RateLimiter,
+        retoma do último nextPageToken (até `retomadas` vezes) sem baixar de novo as páginas já
+        recebidas. Se ainda assim falhar, devolve as issues já obtidas com status/erro no debug
+        e `partial=True` — quem precisa do conjunto completo deve conferir `status == 200`.
+        """
+        issues: List[Any] = []
+        token: Optional[str] = None
+        pages = 0
+        for tentativa in range(int(retomadas) + 1):
+            dbg: Dict[str, Any] = {}
+            issues.extend(self.iter_chamados(jql, fields, page_size=page_size, reconcile=reconcile,
+                                             projetar=projetar, dbg=dbg, next_page_token=token))
+            pages += dbg.get("pages", 0)
+            if dbg.get("status") == 200:
+                return issues, {**dbg, "count": len(issues), "pages": pages, "resumed": tentativa}
+            retomavel = dbg.get("status") in THROTTLE_STATUS or dbg.get("status") == -1
+            if not retomavel or tentativa == int(retomadas):
+                break
+            token = dbg.get("next_page_token")
+            time.sleep(self.limiter.backoff(tentativa))
+        return issues, {**dbg, "count": len(issues), "pages": pages, "partial": bool(issues), "resumed": tentativa}
+
+    # ---------- execução concorrente ----------
+    def executar_concorrente(self, tarefas: Dict[str, Callable[[], Any]], max_in_flight: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Executa callables independentes (buscas, whoami, ...) em paralelo e devolve {nome: resultado}.
+        No máximo `max_in_flight` chamadas simultâneas (padrão: tamanho do pool de conexões).
+        Exceções de uma tarefa são propagadas ao ler o resultado.
+        """
+        if not tarefas:
+            return {}
+        workers = max(1, min(int(max_in_flight or self.pool_size), len(tarefas)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jira") as ex:
+            futures = {nome: ex.submit(fn) for nome, fn in tarefas.items()}
+            return {nome: fut.result() for nome, fut in futures.items()}
+
+    def buscar_varios(
+        self,
+        consultas: Dict[str, Union[str, Tuple[str, int]]],
+        fields: str | List[str],
+        page_size: int = 100,
+        max_in_flight: Optional[int] = None,
+    ) -> Dict[str, Tuple[List[dict], Dict[str, Any]]]:
+        """
+        Roda N JQLs em paralelo. `consultas` = {nome: jql} ou {nome: (jql, page_size)}.
+        Retorna {nome: (issues, debug_dict)} — mesmo formato de buscar_chamados_enhanced.
+        """
+        tarefas = {}
+        for nome, consulta in consultas.items():
+            jql, size = consulta if isinstance(consulta, tuple) else (consulta, page_size)
+            tarefas[nome] = (lambda jql=jql, size=size: self.buscar_chamados_enhanced(jql, fields, page_size=size))
+        return self.executar_concorrente(tarefas, max_in_flight=max_in_flight)
 
     # ---------- transições / leitura ----------
+    def particionar_por_status(self, issues: list, status_map: Dict[Any, str]) -> Dict[str, List[dict]]:
+        """
+        Separa localmente um resultado combinado por status (issues brutas ou Chamado).
+        `status_map` aceita id ou nome do status → nome da visão; a ordem original é preservada.
+        """
+        lookup = {str(k).lower(): v for k, v in status_map.items()}
+        out: Dict[str, List[Any]] = {v: [] for v in status_map.values()}
+        for issue in issues or []:
+            if isinstance(issue, Chamado):
+                st = {"id": issue.status_id, "name": issue.status}
+            else:
+                st = (issue.get("fields") or {}).get("status") or {}
+            view = lookup.get(str(st.get("id", "")).lower()) or lookup.get(str(st.get("name", "")).lower())
+            if view is not None:
+                out[view].append(issue)
+        return out
+
     def agrupar_chamados(self, issues: list) -> dict:
+        """Agrupa por loja como registros Chamado (aceita issues brutas ou já normalizadas)."""
         agrup = defaultdict(list)
-        for issue in issues:
-            f = issue.get("fields", {})
-            loja = f.get("customfield_14954", {}).get("value", "Loja Desconhecida")
-            agrup[loja].append({
-                "key": issue.get("key"),
-                "pdv": f.get("customfield_14829", "--"),
-                "ativo": f.get("customfield_14825", {}).get("value", "--"),
-                "problema": f.get("customfield_12374", "--"),
-                "endereco": f.get("customfield_12271", "--"),
-                "estado": (f.get("customfield_11948") or {}).get("value", "--"),
-                "cep": f.get("customfield_11993", "--"),
-                "cidade": f.get("customfield_11994", "--"),
-                "data_agendada": f.get("customfield_12036"),
-            })
+        for ch in normalizar(issues):
+            agrup[ch.loja].append(ch)
         return agrup
 
-    def get_transitions(self, issue_key: str) -> list:
+    def get_transitions(self, issue_key: str, status: Optional[str] = None) -> list:
+        """
+        Transições disponíveis para a issue. Com `status` (status atual da issue), usa/alimenta
+        o catálogo em cache por (projeto, status) e evita o GET por issue.
+        """
+        ck = _transicao_key(issue_key, status) if status else None
+        if ck is not None:
+            with self._transicoes_lock:
+                cached = self._transicoes.get(ck)
+            if cached is not None:
+                return list(cached)
+
         url = f"{self._base()}/issue/{issue_key}/transitions"
         try:
             r = self._req("GET", url, json_content=False)
             if r.status_code == 200:
-                return r.json().get("transitions", [])
+                trans = r.json().get("transitions", [])
+                if ck is not None:
+                    with self._transicoes_lock:
+                        self._transicoes[ck] = list(trans)
+                return trans
         except requests.RequestException:
             pass
         return []
 
+    def precarregar_transicoes(self, amostras: Dict[str, str]) -> Dict[str, int]:
+        """
+        Aprende o catálogo de transições a partir de uma issue de exemplo por status
+        (`amostras` = {status: issue_key}), em paralelo. Retorna {status: nº de transições}.
+        """
+        tarefas = {
+            status: (lambda k=key, s=status: self.get_transitions(k, status=s))
+            for status, key in amostras.items()
+            if key and _transicao_key(key, status) not in self._transicoes
+        }
+        return {status: len(trans) for status, trans in self.executar_concorrente(tarefas).items()}
+
+    def invalidar_transicoes(self, issue_key: Optional[str] = None, status: Optional[str] = None):
+        with self._transicoes_lock:
+            if issue_key is None or status is None:
+                self._transicoes.clear()
+            else:
+                self._transicoes.pop(_transicao_key(issue_key, status), None)
+
+    def transicoes_info(self) -> Dict[str, int]:
+        with self._transicoes_lock:
+            return {f"{p}/{s}": len(t) for (p, s), t in self._transicoes.items()}
+
     def get_issue(self, issue_key: str) -> dict:
         url = f"{self._base()}/issue/{issue_key}"
         params = {"fields": "status"}
@@ -225,6 +478,122 @@ class JiraAPI:
             payload["fields"] = fields
         return self._req("POST", url, json_body=payload)
 
+    # ---------- transições em massa ----------
+    def transicionar_em_massa(
+        self,
+        plano: Dict[str, List[Dict[str, Any]]],
+        max_in_flight: Optional[int] = None,
+        progresso: Optional[Callable[[int, int, str, Dict[str, Any]], None]] = None,
+        status_atual: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Executa transições para várias issues em paralelo (até `max_in_flight` issues ao mesmo tempo),
+        com os passos de CADA issue em ordem. `plano` = {key: [passo, ...]}, onde passo é um dict:
+          - "nome":   rótulo para o relatório (ex.: "agendar", "tec-campo");
+          - "id":     transition id fixo, OU
+          - "match":  callable(transição) → bool, escolhida entre as disponíveis (get_transitions);
+          - "fields": campos extras enviados na transição (opcional).
+        Passo sem transição disponível é pulado ("skip"); uma falha HTTP interrompe os passos
+        seguintes daquela issue. `progresso(feitos, total, key, resultado)` é chamado na thread
+        de quem chamou (seguro para atualizar a UI do Streamlit).
+        Com `status_atual` ({key: status}), os passos "match" usam o catálogo de transições em
+        cache; se o Jira recusar uma transição vinda do cache por não valer no status atual
+        (ver `_transicao_recusada`), o catálogo daquele status é invalidado e o passo é refeito
+        uma vez com as transições atuais da issue. O mesmo vale para "id" fixo tirado do
+        catálogo (invalida, sem refazer). Passo "match" sem candidata no catálogo confere uma
+        vez a lista ao vivo antes de virar "skip".
+        Retorna {key: {"ok": bool, "passos": [{"nome", "status", "transition_id", "erro"}]}}.
+        """
+        status_atual = status_atual or {}
+        if not plano:
+            return {}
+        out: Dict[str, Dict[str, Any]] = {}
+        workers = max(1, min(int(max_in_flight or self.pool_size), len(plano)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jira-transition") as ex:
+            futures = {ex.submit(self._executar_passos, key, passos, status_atual.get(key)): key
+                       for key, passos in plano.items()}
+            for feitos, fut in enumerate(as_completed(futures), start=1):
+                key = futures[fut]
+                out[key] = fut.result()
+                if progresso is not None:
+                    progresso(feitos, len(plano), key, out[key])
+        return {key: out[key] for key in plano}
+
+    def _executar_passos(self, key: str, passos: List[Dict[str, Any]], status: Optional[str] = None) -> Dict[str, Any]:
+        resultados = []
+        ok = True
+        for passo in passos:
+            res = {"nome": passo.get("nome"), "status": None, "transition_id": None, "erro": None}
+            resultados.append(res)
+            tid = passo.get("id")
+            match = passo.get("match")
+            escolhida = None
+            do_catalogo = bool(status) and (tid is None or self._no_catalogo(key, status, tid))
+            if tid is None:
+                match = match or (lambda t: False)
+                escolhida = next((t for t in self.get_transitions(key, status=status) if match(t)), None)
+                if escolhida is None and status:
+                    # transição criada no workflow depois do aquecimento do catálogo: confere ao vivo
+                    escolhida = next((t for t in self.get_transitions(key) if match(t)), None)
+                    if escolhida is not None:
+                        self.invalidar_transicoes(key, status)
+                        do_catalogo = False
+                tid = escolhida["id"] if escolhida else None
+            if tid is None:
+                res["status"] = "skip"
+                continue
+            res["transition_id"] = tid
+            self._transicionar_passo(key, tid, passo, res)
+            if do_catalogo and _transicao_recusada(res):
+                # transição vinda do cache recusada: invalida e, se o passo é por "match",
+                # tenta uma vez com a lista atual (id fixo não tem alternativa)
+                self.invalidar_transicoes(key, status)
+                nova = next((t for t in self.get_transitions(key) if match(t)), None) if match else None
+                if nova is not None:
+                    escolhida, res["transition_id"] = nova, nova["id"]
+                    self._transicionar_passo(key, nova["id"], passo, res)
+            if res["status"] != 204:
+                ok = False
+                break
+            # status seguinte conhecido só quando a transição veio do catálogo
+            status = ((escolhida or {}).get("to") or {}).get("name") if escolhida else None
+        return {"ok": ok, "passos": resultados}
+
+    def _no_catalogo(self, issue_key: str, status: str, tid: Any) -> bool:
+        """`tid` consta do catálogo em cache de (projeto, status)? (id fixo escolhido a partir dele)"""
+        with self._transicoes_lock:
+            cached = self._transicoes.get(_transicao_key(issue_key, status)) or []
+        return any(str(t.get("id")) == str(tid) for t in cached)
+
+    def _transicionar_passo(self, key: str, tid: str, passo: Dict[str, Any], res: Dict[str, Any]):
+        try:
+            r = self.transicionar_status(key, tid, fields=passo.get("fields") or None)
+            res["status"] = r.status_code
+            res["erro"] = None if r.status_code == 204 else _safe_json(r)
+        except requests.RequestException as e:
+            res["status"], res["erro"] = -1, str(e)
+
+
+def _transicao_key(issue_key: str, status: str) -> Tuple[str, str]:
+    return (issue_key.rsplit("-", 1)[0].upper(), str(status).strip().lower())
+
+
+def _transicao_recusada(res: Dict[str, Any]) -> bool:
+    """
+    O Jira recusou a transição por ela não valer para o status atual da issue (catálogo
+    desatualizado): 409, ou 400 com errorMessages sobre a transição e sem erros de campo.
+    Limite (429/503), validação de campos e demais 4xx não indicam catálogo velho.
+    """
+    status = res["status"] or 0
+    if status in THROTTLE_STATUS:
+        return False
+    if status == 409:
+        return True
+    erro = res["erro"] if isinstance(res["erro"], dict) else {}
+    if status != 400 or erro.get("errors"):
+        return False
+    return any("transition" in str(m).lower() for m in erro.get("errorMessages") or [])
+
 
 def _safe_json(r: requests.Response):
     try:
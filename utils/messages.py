@@ -1,8 +1,10 @@
+import threading
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 
 def gerar_mensagem(loja, chamados):
     """
-    Gera mensagem para um grupo de chamados da mesma loja,
+    Gera mensagem para um grupo de chamados (utils.records.Chamado) da mesma loja,
     listando cada FSA e no final um bloco único de endereço.
     """
     blocos = []
@@ -10,19 +12,19 @@ def gerar_mensagem(loja, chamados):
 
     for ch in chamados:
         linhas = [
-            f"*{ch['key']}*",
+            f"*{ch.key}*",
             f"Loja: {loja}",
-            f"PDV: {ch.get('pdv','--')}",
-            f"*ATIVO: {ch.get('ativo','--')}*",
-            f"Problema: {ch.get('problema','--')}",
+            f"PDV: {ch.pdv or '--'}",
+            f"*ATIVO: {ch.ativo or '--'}*",
+            f"Problema: {ch.problema or '--'}",
             "***"
         ]
         blocos.append("\n".join(linhas))
         endereco_info = (
-            ch.get('endereco','--'),
-            ch.get('estado','--'),
-            ch.get('cep','--'),
-            ch.get('cidade','--')
+            ch.endereco or '--',
+            ch.estado or '--',
+            ch.cep or '--',
+            ch.cidade or '--'
         )
 
     if endereco_info:
@@ -42,16 +44,60 @@ def gerar_mensagem(loja, chamados):
 
     return "\n\n".join(blocos)
 
-def verificar_duplicidade(chamados):
+class MensagemCache:
     """
-    Retorna set de tuplas (pdv, ativo) que aparecem mais de uma vez.
+    Memoiza gerar_mensagem por impressão digital (loja, keys, updated de cada FSA):
+    só lojas cujos chamados mudaram são re-renderizadas entre refreshes. LRU limitado
+    a `max_entries`; seguro para uso entre sessões/threads.
     """
-    seen = {}
-    duplicates = set()
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = int(max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def fingerprint(loja, chamados):
+        return (loja, tuple((ch.key, ch.updated) for ch in chamados))
+
+    def get(self, loja, chamados):
+        fp = self.fingerprint(loja, chamados)
+        with self._lock:
+            msg = self._data.get(fp)
+            if msg is not None:
+                self._data.move_to_end(fp)
+                self.stats["hits"] += 1
+                return msg
+        msg = gerar_mensagem(loja, chamados)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._data[fp] = msg
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return msg
+
+    def gerar_todas(self, grupos):
+        """Modo em lote: {loja: [Chamado]} → {loja: mensagem}, em ordem de loja."""
+        return {loja: self.get(loja, grupos[loja]) for loja in sorted(grupos)}
+
+    def texto_unico(self, grupos, separador="\n\n" + "=" * 40 + "\n\n"):
+        """Todas as mensagens num único texto (copiar/exportar)."""
+        return separador.join(self.gerar_todas(grupos).values())
+
+    def info(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._data)}
+
+
+def indice_duplicidade(chamados):
+    """
+    Índice (loja, pdv, ativo) → [keys] só com os grupos que têm 2+ FSAs, montado numa
+    única passada sobre todo o backlog (todos os status). Chamados sem PDV e sem ativo
+    não entram (não há o que comparar).
+    """
+    grupos = defaultdict(list)
     for ch in chamados:
-        key = (ch.get("pdv"), ch.get("ativo"))
-        if key in seen:
-            duplicates.add(key)
-        else:
-            seen[key] = True
-    return duplicates
+        if ch.pdv or ch.ativo:
+            grupos[(ch.loja, ch.pdv, ch.ativo)].append(ch.key)
+    return {k: keys for k, keys in grupos.items() if len(keys) > 1}
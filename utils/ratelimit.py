@@ -0,0 +1,140 @@
+# utils/ratelimit.py
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+THROTTLE_STATUS = (429, 503)
+
+
+def retry_after_seconds(r: requests.Response) -> Optional[float]:
+    """Valor do header Retry-After em segundos (aceita segundos ou data HTTP)."""
+    val = (r.headers or {}).get("Retry-After")
+    if not val:
+        return None
+    try:
+        return max(0.0, float(val))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class RateLimiter:
+    """
+    Agendador de requisições do cliente Jira, compartilhado por todas as threads:
+
+      • token bucket: no máximo `rate` req/s em média, com rajadas de até `burst`;
+      • concorrência adaptativa (AIMD): o limite de requisições em voo cai pela metade a cada
+        429/503 e volta a subir devagar (+1 por "janela" de sucessos) até `max_concurrency`;
+      • 429/503: respeita Retry-After (ou backoff exponencial com jitter), pausando TODAS as
+        threads até lá, e repete a mesma requisição até `max_retries` vezes.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_concurrency = float(max_concurrency)
+        self.min_concurrency = float(min_concurrency)
+        self.max_retries = int(max_retries)
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._limit = self.max_concurrency
+        self._inflight = 0
+        self._pause_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "waited_s": 0.0}
+
+    # ---------- slots ----------
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self):
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._pause_until:
+                    self._cond.wait(self._pause_until - now)
+                elif self._inflight >= int(self._limit):
+                    self._cond.wait()
+                elif self._tokens < 1:
+                    self._cond.wait((1 - self._tokens) / self.rate)
+                else:
+                    self._tokens -= 1
+                    self._inflight += 1
+                    self.stats["requests"] += 1
+                    self.stats["waited_s"] += time.monotonic() - started
+                    return
+
+    def release(self, throttled: bool = False):
+        with self._cond:
+            self._inflight -= 1
+            if throttled:
+                self._limit = max(self.min_concurrency, self._limit / 2)
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    # ---------- execução ----------
+    def executar(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """Envia via `send()` respeitando o agendador; devolve a última resposta (pode ser 429/503)."""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                r = send()
+            except Exception:
+                self.release()
+                raise
+            throttled = r.status_code in THROTTLE_STATUS
+            self.release(throttled)
+            if not throttled:
+                return r
+            with self._cond:
+                self.stats["throttled"] += 1
+            if attempt >= self.max_retries:
+                return r
+            delay = retry_after_seconds(r)
+            delay = self.backoff(attempt) if delay is None else delay + random.uniform(0, 0.25)
+            self.pause(delay)
+            attempt += 1
+            with self._cond:
+                self.stats["retries"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "waited_s": round(self.stats["waited_s"], 2),
+                "concurrency_limit": round(self._limit, 2),
+                "inflight": self._inflight,
+                "paused_s": round(max(0.0, self._pause_until - time.monotonic()), 2),
+            }
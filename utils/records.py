@@ -0,0 +1,134 @@
+# utils/records.py
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LOJA_DESCONHECIDA = "Loja Desconhecida"
+
+# mapa campo do Jira → atributo do registro
+CF_LOJA = "customfield_14954"
+CF_PDV = "customfield_14829"
+CF_ATIVO = "customfield_14825"
+CF_PROBLEMA = "customfield_12374"
+CF_ENDERECO = "customfield_12271"
+CF_UF = "customfield_11948"
+CF_CEP = "customfield_11993"
+CF_CIDADE = "customfield_11994"
+CF_DATA_AGENDADA = "customfield_12036"
+
+
+_FORMATOS_DT = ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z")
+
+
+@lru_cache(maxsize=65536)
+def parse_dt(dt_str: Optional[str], utc: bool = True) -> Optional[datetime]:
+    """
+    Timestamp do Jira (ISO-8601 com offset) → datetime em UTC (ou no offset original, se utc=False).
+    Caminho rápido via fromisoformat; strptime só como fallback. Memoizado: o mesmo texto
+    (ex.: `updated` repetido entre refreshes) é parseado uma única vez por processo.
+    """
+    if not dt_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(dt_str)
+    except (TypeError, ValueError):
+        dt = None
+    if dt is None or dt.tzinfo is None:
+        dt = None
+        for fmt in _FORMATOS_DT:
+            try:
+                dt = datetime.strptime(dt_str, fmt)
+                break
+            except Exception:
+                pass
+        if dt is None:
+            return None
+    return dt.astimezone(timezone.utc) if utc else dt
+
+
+def _value(obj: Any) -> str:
+    """Campos dropdown do Jira vêm como {"value": ...}; texto vem direto."""
+    if isinstance(obj, dict):
+        return obj.get("value") or ""
+    return obj or ""
+
+
+def loja_from_issue(issue: dict) -> str:
+    return _value((issue.get("fields") or {}).get(CF_LOJA)) or LOJA_DESCONHECIDA
+
+
+class Chamado:
+    """
+    Registro compacto de uma FSA, extraído uma única vez do JSON bruto do Jira.
+    Textos ausentes viram "" e datas viram datetime (UTC) ou None — exceto `data_agendada`,
+    que mantém o offset original (o dia exibido é o dia local do agendamento).
+    `data_agendada_raw` guarda o texto original para exibição quando não parseia.
+    """
+
+    __slots__ = (
+        "key", "status", "status_id", "loja", "pdv", "ativo", "problema",
+        "endereco", "cidade", "estado", "cep",
+        "data_agendada", "data_agendada_raw", "created", "updated", "resolution",
+    )
+
+    def __init__(self, **kw):
+        for name in self.__slots__:
+            setattr(self, name, kw.get(name))
+
+    @classmethod
+    def from_issue(cls, issue: dict) -> "Chamado":
+        f = issue.get("fields") or {}
+        st = f.get("status") or {}
+        raw_ag = f.get(CF_DATA_AGENDADA)
+        return cls(
+            key=issue.get("key"),
+            status=st.get("name") or "",
+            status_id=str(st.get("id") or ""),
+            loja=_value(f.get(CF_LOJA)) or LOJA_DESCONHECIDA,
+            pdv=_value(f.get(CF_PDV)),
+            ativo=_value(f.get(CF_ATIVO)),
+            problema=_value(f.get(CF_PROBLEMA)),
+            endereco=_value(f.get(CF_ENDERECO)),
+            cidade=_value(f.get(CF_CIDADE)),
+            estado=_value(f.get(CF_UF)),
+            cep=_value(f.get(CF_CEP)),
+            data_agendada=parse_dt(raw_ag, utc=False),
+            data_agendada_raw=raw_ag or "",
+            created=parse_dt(f.get("created")),
+            updated=parse_dt(f.get("updated")),
+            resolution=parse_dt(f.get("resolutiondate")),
+        )
+
+    # acesso estilo dict (compatível com quem ainda lê ch.get("pdv", "--"))
+    def get(self, name: str, default: Any = None) -> Any:
+        val = getattr(self, name, None) if name in self.__slots__ else None
+        return default if val in (None, "") else val
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Chamado({self.key!r}, {self.status!r}, loja={self.loja!r})"
+
+
+def chave_agenda(ch: "Chamado") -> Tuple[tuple, str]:
+    """
+    Chave de agrupamento dos Agendados: (ordenável, rótulo). Datas válidas vêm primeiro, em
+    ordem cronológica (não pela string "dd/mm/aaaa"); depois textos não parseados; por
+    último "Não definida".
+    """
+    if ch.data_agendada:
+        return (0, ch.data_agendada.date().isoformat()), ch.data_agendada.strftime("%d/%m/%Y")
+    if ch.data_agendada_raw:
+        return (1, str(ch.data_agendada_raw)), str(ch.data_agendada_raw)
+    return (2, ""), "Não definida"
+
+
+def normalizar(issues: Iterable[Any]) -> List[Chamado]:
+    """Converte issues brutas em Chamado (registros já normalizados passam direto)."""
+    return [i if isinstance(i, Chamado) else Chamado.from_issue(i) for i in issues or []]
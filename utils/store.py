@@ -0,0 +1,155 @@
+# utils/store.py
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .records import Chamado
+
+_DT_COLS = ("data_agendada", "created", "updated", "resolution")
+_COLS = Chamado.__slots__
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS issues (
+    {", ".join(f"{c} TEXT" + (" PRIMARY KEY" if c == "key" else "") for c in _COLS)}
+);
+CREATE INDEX IF NOT EXISTS ix_issues_status ON issues(status);
+CREATE INDEX IF NOT EXISTS ix_issues_status_id ON issues(status_id);
+CREATE INDEX IF NOT EXISTS ix_issues_loja ON issues(loja);
+CREATE INDEX IF NOT EXISTS ix_issues_updated ON issues(updated);
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+"""
+
+
+def _to_db(ch: Chamado) -> tuple:
+    return tuple(
+        (getattr(ch, c).isoformat() if getattr(ch, c) is not None else None) if c in _DT_COLS
+        else getattr(ch, c)
+        for c in _COLS
+    )
+
+
+def _from_db(row: tuple) -> Chamado:
+    kw = dict(zip(_COLS, row))
+    for c in _DT_COLS:
+        if kw[c]:
+            kw[c] = datetime.fromisoformat(kw[c])
+    return Chamado(**kw)
+
+
+class IssueStore:
+    """
+    Armazena em SQLite os registros Chamado das issues acompanhadas (um arquivo local),
+    indexados por key, status, loja e updated. Serve de warm start após restart e
+    permite consultar por loja/status/período sem ir ao Jira.
+
+    Datas ficam em ISO-8601 (UTC, exceto data_agendada, que mantém o offset original).
+    Uma conexão por instância, protegida por lock (o worker grava, as sessões leem).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ---------- escrita ----------
+    def upsert(self, chamados: Iterable[Chamado]):
+        rows = [_to_db(ch) for ch in chamados]
+        if not rows:
+            return
+        sql = f"INSERT OR REPLACE INTO issues ({', '.join(_COLS)}) VALUES ({', '.join('?' * len(_COLS))})"
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def remover(self, keys: Iterable[str]):
+        keys = [(k,) for k in keys]
+        if not keys:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM issues WHERE key = ?", keys)
+
+    def substituir(self, chamados: Iterable[Chamado]):
+        """Troca todo o conteúdo (resultado de uma sincronização completa) numa transação."""
+        rows = [_to_db(ch) for ch in chamados]
+        sql = f"INSERT INTO issues ({', '.join(_COLS)}) VALUES ({', '.join('?' * len(_COLS))})"
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM issues")
+            self._conn.executemany(sql, rows)
+
+    # ---------- leitura ----------
+    def consultar(
+        self,
+        status: Optional[Sequence[str]] = None,
+        loja: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        campo_data: str = "updated",
+    ) -> List[Chamado]:
+        """
+        Registros filtrados por status (nomes ou ids), loja e intervalo [desde, ate] em `campo_data`
+        (datetimes em UTC), ordenados por updated desc.
+        """
+        where, args = self._where(status, loja, desde, ate, campo_data)
+        sql = f"SELECT {', '.join(_COLS)} FROM issues{where} ORDER BY updated DESC"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [_from_db(r) for r in rows]
+
+    @staticmethod
+    def _where(status=None, loja=None, desde=None, ate=None, campo_data="updated"):
+        if campo_data not in _DT_COLS:
+            raise ValueError(f"campo_data inválido: {campo_data}")
+        where, args = [], []
+        if status:
+            marks = ", ".join("?" * len(status))
+            where.append(f"(status IN ({marks}) OR status_id IN ({marks}))")
+            args += [str(s) for s in status] * 2
+        if loja:
+            where.append("loja = ?")
+            args.append(loja)
+        if desde is not None:
+            where.append(f"{campo_data} >= ?")
+            args.append(desde.isoformat())
+        if ate is not None:
+            where.append(f"{campo_data} <= ?")
+            args.append(ate.isoformat())
+        return (" WHERE " + " AND ".join(where) if where else ""), args
+
+    def keys(self, status: Optional[Sequence[str]] = None, loja: Optional[str] = None) -> List[str]:
+        where, args = self._where(status, loja)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key FROM issues{where} ORDER BY updated DESC", args).fetchall()
+        return [r[0] for r in rows]
+
+    def lojas(self, status: Optional[Sequence[str]] = None) -> List[str]:
+        where, args = self._where(status)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT loja FROM issues{where} ORDER BY loja", args).fetchall()
+        return [r[0] for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+
+    # ---------- metadados (marca d'água do sync etc.) ----------
+    def get_meta(self, k: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, k: str, v: Any):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", (k, str(v)))
+
+    def info(self) -> Dict[str, Any]:
+        return {"path": self.path, "issues": self.count()}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,209 @@
+# utils/sync.py
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Tuple, Dict, Any, Optional, List, Iterable
+
+from .records import Chamado
+
+_MIN_DT = datetime.min.replace(tzinfo=timezone.utc)
+
+_ORDER_BY = re.compile(r"\s+ORDER\s+BY\s+.*$", re.IGNORECASE | re.DOTALL)
+
+
+def strip_order_by(jql: str) -> str:
+    return _ORDER_BY.sub("", jql or "").strip()
+
+
+class IssueSync:
+    """
+    Mantém o último conjunto de issues de um JQL (como registros Chamado) e, a cada
+    refresh, pede ao Jira apenas o que mudou desde a última sincronização (delta por `updated`).
+
+      • Primeira chamada (ou a cada `full_every` segundos): busca completa do `jql`.
+      • Demais: `<scope_jql> AND updated >= -Nm` — sem filtro de status, para
+        enxergar também as issues que SAÍRAM dos status acompanhados.
+        Issues do delta com status em `statuses` são mescladas por key;
+        as demais são removidas do conjunto.
+
+    O delta usa janela relativa em minutos (independe do fuso do usuário no Jira)
+    com uma margem de segurança (`overlap_min`). `refresh` é serializado por lock,
+    então a instância pode ser compartilhada entre sessões.
+
+    Com `store` (utils.store.IssueStore), cada sync grava no SQLite e a instância
+    começa com o conteúdo salvo (warm start): o primeiro refresh é um delta desde a
+    última sincronização gravada, e a ressincronização completa fica para depois.
+
+    `versao` só avança quando o conjunto muda (full ou delta com alterações/remoções);
+    issues que voltam idênticas na margem do delta não contam como mudança.
+    """
+
+    def __init__(
+        self,
+        jql: str,
+        scope_jql: str,
+        statuses: Iterable[Any],
+        full_every: float = 30 * 60,
+        overlap_min: int = 2,
+        store=None,
+    ):
+        self.jql = jql
+        self.scope_jql = strip_order_by(scope_jql)
+        self.statuses = {str(s).lower() for s in statuses}
+        self.full_every = float(full_every)
+        self.overlap_min = int(overlap_min)
+
+        self.issues: Dict[str, Chamado] = {}
+        self.last_sync: Optional[float] = None
+        self.last_full: Optional[float] = None
+        self.versao: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.store = store
+        if store is not None:
+            self._warm_start()
+
+    # ---------- helpers ----------
+    def _warm_start(self):
+        last_sync = self.store.get_meta(self._meta_key("last_sync"))
+        if last_sync is None:
+            return
+        self.issues = {ch.key: ch for ch in self.store.consultar()}
+        self.last_sync = self.versao = float(last_sync)
+        # adia o full: o delta desde last_sync já cobre o que mudou com o processo parado
+        self.last_full = time.time()
+
+    def _meta_key(self, name: str) -> str:
+        return f"sync:{self.jql}:{name}"
+
+    def _tracked(self, ch: Chamado) -> bool:
+        return ch.status_id.lower() in self.statuses or ch.status.lower() in self.statuses
+
+    def delta_jql(self, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        minutes = math.ceil(max(0.0, now - (self.last_sync or now)) / 60) + self.overlap_min
+        return f"{self.scope_jql} AND updated >= -{minutes}m ORDER BY updated DESC"
+
+    def needs_full(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return self.last_full is None or (now - self.last_full) >= self.full_every
+
+    def snapshot(self) -> List[Chamado]:
+        """Registros atuais ordenados por `updated` desc (mesma ordem dos JQLs do painel)."""
+        return sorted(self.issues.values(), key=lambda ch: ch.updated or _MIN_DT, reverse=True)
+
+    def reset(self):
+        self.issues.clear()
+        self.last_sync = None
+        self.last_full = None
+        self.versao = None
+
+    # ---------- sincronização ----------
+    def refresh(self, jira, fields, page_size: int = 100, force_full: bool = False) -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        Retorna (issues, debug_dict) — mesmo formato de JiraAPI.buscar_chamados_enhanced.
+        Em caso de falha no delta, mantém o conjunto anterior e não avança a marca d'água.
+        """
+        with self._lock:
+            return self._refresh(jira, fields, page_size, force_full)
+
+    def _refresh(self, jira, fields, page_size: int, force_full: bool) -> Tuple[List[dict], Dict[str, Any]]:
+        started = time.time()
+
+        if force_full or self.needs_full(started):
+            batch, dbg = jira.buscar_chamados_enhanced(self.jql, fields, page_size=page_size)
+            if dbg.get("status") != 200:
+                return self.snapshot(), {**dbg, "mode": "full", "count": len(self.issues)}
+            self.issues = {ch.key: ch for ch in map(Chamado.from_issue, batch) if ch.key}
+            self.last_sync = self.last_full = self.versao = started
+            if self.store is not None:
+                self.store.substituir(self.issues.values())
+                self.store.set_meta(self._meta_key("last_sync"), started)
+            return self.snapshot(), {**dbg, "mode": "full", "count": len(self.issues)}
+
+        jql = self.delta_jql(started)
+        batch, dbg = jira.buscar_chamados_enhanced(jql, fields, page_size=page_size)
+        if dbg.get("status") != 200:
+            return self.snapshot(), {**dbg, "mode": "delta", "count": len(self.issues)}
+
+        upserts, removidos = [], []
+        for ch in map(Chamado.from_issue, batch):
+            if not ch.key:
+                continue
+            if self._tracked(ch):
+                atual = self.issues.get(ch.key)
+                if atual is not None and atual.as_dict() == ch.as_dict():
+                    continue
+                self.issues[ch.key] = ch
+                upserts.append(ch)
+            elif self.issues.pop(ch.key, None) is not None:
+                removidos.append(ch.key)
+        changed, removed = len(upserts), len(removidos)
+        self.last_sync = started
+        if changed or removed:
+            self.versao = started
+        if self.store is not None:
+            self.store.upsert(upserts)
+            self.store.remover(removidos)
+            self.store.set_meta(self._meta_key("last_sync"), started)
+        return self.snapshot(), {
+            **dbg, "mode": "delta", "jql": jql, "fetched": len(batch),
+            "changed": changed, "removed": removed, "count": len(self.issues),
+        }
+
+
+class SondaMudancas:
+    """
+    Decide se vale a pena buscar de novo o resultado de um JQL, comparando a impressão
+    digital barata (JiraAPI.impressao_digital: count + updated mais recente) com a da última
+    busca confirmada. Fluxo por refresh:
+
+        mudou, imp = sonda.verificar(jira, "spare", jql)
+        if mudou:
+            ... busca paginada ...
+            sonda.confirmar("spare", imp)   # só depois de publicar o resultado
+
+    Vale para JQLs que seriam repaginados inteiros; o delta do IssueSync já é uma busca
+    pequena e não precisa de sonda.
+
+    Falha na sonda conta como "mudou". A cada `max_reuso` segundos a busca é refeita mesmo
+    sem mudança aparente (o approximate-count do Jira pode atrasar alguns segundos).
+    """
+
+    def __init__(self, max_reuso: float = 10 * 60):
+        self.max_reuso = float(max_reuso)
+        self._vistos: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"probes": 0, "unchanged": 0}
+
+    def verificar(self, jira, chave: str, jql: str) -> Tuple[bool, Dict[str, Any]]:
+        imp = jira.impressao_digital(jql)
+        with self._lock:
+            self.stats["probes"] += 1
+            prev = self._vistos.get(chave)
+            inalterado = (
+                imp.get("status") == 200 and prev is not None and prev[0] == imp
+                and (time.time() - prev[1]) < self.max_reuso
+            )
+            if inalterado:
+                self.stats["unchanged"] += 1
+        return not inalterado, imp
+
+    def confirmar(self, chave: str, impressao: Dict[str, Any]):
+        """Registra a impressão tirada ANTES da busca que acabou de ser publicada."""
+        if impressao.get("status") == 200:
+            with self._lock:
+                self._vistos[chave] = (impressao, time.time())
+
+    def esquecer(self, chave: Optional[str] = None):
+        with self._lock:
+            if chave is None:
+                self._vistos.clear()
+            else:
+                self._vistos.pop(chave, None)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "tracked": {k: v[0] for k, v in self._vistos.items()}}
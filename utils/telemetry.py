@@ -0,0 +1,135 @@
+# utils/telemetry.py
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# limites (ms) dos baldes do histograma de latência; o último balde é "acima do maior"
+BALDES_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+_RE_BASE = re.compile(r"^.*?/rest/api/3")
+_RE_ISSUE = re.compile(r"/issue/[^/?]+")
+
+
+def endpoint_de(url: str) -> str:
+    """URL completa → endpoint agregável: /rest/api/3/issue/FSA-1/transitions → /issue/{key}/transitions."""
+    path = _RE_BASE.sub("", url.split("?", 1)[0])
+    return _RE_ISSUE.sub("/issue/{key}", path) or "/"
+
+
+def _percentil(ordenado: List[float], p: float) -> float:
+    if not ordenado:
+        return 0.0
+    return ordenado[min(len(ordenado) - 1, int(round(p * (len(ordenado) - 1))))]
+
+
+class Telemetria:
+    """
+    Registro de cada requisição HTTP do JiraAPI (método, endpoint, status, bytes, duração) e
+    de cada busca paginada (páginas, issues, duração). Guarda janelas móveis de `janela`
+    amostras por (método, endpoint) para histogramas/percentis, e as últimas `recentes` chamadas.
+    Thread-safe (o worker e as sessões gravam ao mesmo tempo).
+    """
+
+    def __init__(self, janela: int = 500, recentes: int = 200):
+        self.janela = int(janela)
+        self._lock = threading.Lock()
+        self._dur: Dict[Tuple[str, str], Deque[float]] = {}
+        self._totais: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._recentes: Deque[Dict[str, Any]] = deque(maxlen=int(recentes))
+        self._buscas: Deque[Dict[str, Any]] = deque(maxlen=int(recentes))
+
+    def registrar(self, method: str, url: str, status: int, nbytes: int, duracao: float):
+        ep = (method, endpoint_de(url))
+        with self._lock:
+            self._dur.setdefault(ep, deque(maxlen=self.janela)).append(duracao)
+            tot = self._totais.setdefault(ep, {"calls": 0, "bytes": 0, "status": {}})
+            tot["calls"] += 1
+            tot["bytes"] += nbytes
+            tot["status"][status] = tot["status"].get(status, 0) + 1
+            self._recentes.append({"ts": time.time(), "method": method, "endpoint": ep[1], "status": status,
+                                   "bytes": nbytes, "ms": round(duracao * 1000, 1)})
+
+    def registrar_busca(self, url: str, status: int, pages: int, count: int, duracao: float):
+        with self._lock:
+            self._buscas.append({"ts": time.time(), "endpoint": endpoint_de(url), "status": status,
+                                 "pages": pages, "count": count, "ms": round(duracao * 1000, 1)})
+
+    def resumo(self) -> List[Dict[str, Any]]:
+        """Uma linha por (método, endpoint): chamadas, status, bytes, p50/p90/p99/máx e histograma da janela."""
+        with self._lock:
+            itens = [(ep, sorted(d), dict(self._totais[ep], status=dict(self._totais[ep]["status"])))
+                     for ep, d in self._dur.items()]
+        out = []
+        for (method, endpoint), dur, tot in sorted(itens, key=lambda x: -sum(x[1])):
+            ms = [d * 1000 for d in dur]
+            hist = [0] * (len(BALDES_MS) + 1)
+            for v in ms:
+                hist[next((i for i, lim in enumerate(BALDES_MS) if v <= lim), len(BALDES_MS))] += 1
+            out.append({
+                "method": method, "endpoint": endpoint, **tot,
+                "p50_ms": round(_percentil(ms, 0.50), 1), "p90_ms": round(_percentil(ms, 0.90), 1),
+                "p99_ms": round(_percentil(ms, 0.99), 1), "max_ms": round(ms[-1] if ms else 0.0, 1),
+                "hist": {f"≤{lim}" if i < len(BALDES_MS) else f">{BALDES_MS[-1]}": n
+                         for i, (lim, n) in enumerate(zip(BALDES_MS + (None,), hist))},
+            })
+        return out
+
+    def recentes(self, n: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recentes)[-n:]
+
+    def buscas(self, n: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._buscas)[-n:]
+
+    def exportar(self) -> Dict[str, Any]:
+        return {"endpoints": self.resumo(), "buscas": self.buscas(10 ** 6), "recentes": self.recentes(10 ** 6)}
+
+    def limpar(self):
+        with self._lock:
+            self._dur.clear()
+            self._totais.clear()
+            self._recentes.clear()
+            self._buscas.clear()
+
+
+class Fases:
+    """
+    Cronômetro de fases nomeadas de uma execução (ex.: fetch, group, aggregate, render, geocode).
+    `span(nome)` mede um bloco; `etapa(nome)` fecha a fase aberta e abre a próxima (útil em
+    scripts lineares, sem reindentar o código); `fim()` fecha a última.
+    """
+
+    def __init__(self):
+        self.tempos: Dict[str, float] = {}
+        self._aberta: Optional[Tuple[str, float]] = None
+        self._inicio = time.perf_counter()
+
+    def _somar(self, nome: str, dur: float):
+        self.tempos[nome] = self.tempos.get(nome, 0.0) + dur
+
+    @contextmanager
+    def span(self, nome: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._somar(nome, time.perf_counter() - t0)
+
+    def etapa(self, nome: str):
+        self.fim()
+        self._aberta = (nome, time.perf_counter())
+
+    def fim(self):
+        if self._aberta is not None:
+            nome, t0 = self._aberta
+            self._somar(nome, time.perf_counter() - t0)
+            self._aberta = None
+
+    def resultado(self) -> Dict[str, float]:
+        """{fase: ms} na ordem em que apareceram, mais o total desde a criação."""
+        return {**{k: round(v * 1000, 1) for k, v in self.tempos.items()},
+                "total": round((time.perf_counter() - self._inicio) * 1000, 1)}
@@ -0,0 +1,90 @@
+# utils/worker.py
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class Snapshot:
+    """Resultado imutável de uma carga do worker (publicado por troca atômica de referência)."""
+
+    __slots__ = ("data", "created_at", "duration", "error", "seq")
+
+    def __init__(self, data: Any, created_at: float, duration: float, error: Optional[str], seq: int):
+        self.data = data
+        self.created_at = created_at
+        self.duration = duration
+        self.error = error
+        self.seq = seq
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class RefreshWorker:
+    """
+    Thread em background que chama `loader()` a cada `interval` segundos e publica o
+    resultado como Snapshot. A UI só lê `snapshot()` — nenhuma interação espera o Jira.
+
+    Se uma carga falhar, o último snapshot bom continua publicado (com `error` preenchido).
+    `trigger()` antecipa a próxima carga (ex.: depois de uma transição).
+    """
+
+    def __init__(self, loader: Callable[[], Any], interval: float = 60, name: str = "refresh-worker"):
+        self.loader = loader
+        self.interval = float(interval)
+        self.name = name
+
+        self._snapshot: Optional[Snapshot] = None
+        self._wake = threading.Event()
+        self._published = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> "RefreshWorker":
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def publicar(self, data: Any, created_at: Optional[float] = None):
+        """Publica um snapshot externo (ex.: warm start do disco) antes da primeira carga."""
+        with self._published:
+            seq = self._snapshot.seq if self._snapshot else 0
+            self._snapshot = Snapshot(data, created_at or time.time(), 0.0, None, seq)
+            self._published.notify_all()
+
+    def trigger(self):
+        self._wake.set()
+
+    def snapshot(self, wait: Optional[float] = None) -> Optional[Snapshot]:
+        """Último snapshot publicado; com `wait`, espera até a primeira carga terminar."""
+        if self._snapshot is None and wait:
+            self.wait_for(0, timeout=wait)
+        return self._snapshot
+
+    def wait_for(self, seq: int, timeout: float) -> Optional[Snapshot]:
+        """Espera um snapshot com seq > `seq` (ou o timeout) e o devolve."""
+        with self._published:
+            self._published.wait_for(lambda: self._snapshot is not None and self._snapshot.seq > seq,
+                                     timeout=timeout)
+        return self._snapshot
+
+    def _run(self):
+        seq = 0
+        while True:
+            self._wake.clear()
+            started = time.time()
+            prev = self._snapshot
+            try:
+                data, error = self.loader(), None
+            except Exception as e:
+                data, error = (prev.data if prev else None), f"{type(e).__name__}: {e}"
+            seq += 1
+            snap = Snapshot(data, time.time() if error is None or prev is None else prev.created_at,
+                            time.time() - started, error, seq)
+            with self._published:
+                self._snapshot = snap
+                self._published.notify_all()
+            self._wake.wait(self.interval)